@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,12 +40,14 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'BlogApp.instrumentation.PerformanceMiddleware',  # Mede tempo e queries de todo o request
+    'BlogApp.routers.ReplicaRoutingMiddleware',  # GETs leem das réplicas de leitura, se houver
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'BlogApp.auth.CachedAuthenticationMiddleware',  # request.user do cache (ver BlogApp.auth.get_user)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     ##AllAuth(google) middleware##
@@ -75,16 +78,86 @@ WSGI_APPLICATION = 'Blog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'blog_db',
-        'USER': 'postgres',
-        'PASSWORD': 'graco',
-        'HOST': 'localhost',
-        'PORT': '5432',
-    }
+# Conexões persistentes por DB_CONN_MAX_AGE segundos, conferidas antes de serem reusadas em um novo request.
+# Com DB_POOL, usa o pool do psycopg 3 (psycopg[pool]) no lugar delas, de DB_POOL_MIN_SIZE a DB_POOL_MAX_SIZE
+# conexões por processo; em ASGI prefira o pool, já que as conexões persistentes ficam presas a cada thread
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+
+_DATABASE = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': 'blog_db',
+    'USER': 'postgres',
+    'PASSWORD': 'graco',
+    'HOST': 'localhost',
+    'PORT': '5432',
+    'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {'pool': {'min_size': DB_POOL_MIN_SIZE, 'max_size': DB_POOL_MAX_SIZE}} if DB_POOL else {},
 }
+DATABASES = {'default': _DATABASE}
+
+# Réplicas de leitura (host ou host:porta, separados por vírgula, com o mesmo banco e usuário): os GETs leem
+# de uma delas e, depois de uma escrita, o cliente lê do primário por DB_REPLICA_STICKY_SECONDS (ver
+# BlogApp.routers). Uma réplica que não responde fica de lado por DB_REPLICA_RETRY_AFTER segundos
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=lambda v: [host.strip() for host in v.split(',') if host.strip()])
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
+DB_REPLICA_RETRY_AFTER = config('DB_REPLICA_RETRY_AFTER', default=30, cast=int)
+for _number, _host in enumerate(DB_REPLICA_HOSTS, 1):
+    _host, _, _port = _host.partition(':')
+    DATABASES[f'replica{_number}'] = {**_DATABASE, 'HOST': _host, 'PORT': _port or _DATABASE['PORT'], 'TEST': {'MIRROR': 'default'}}
+if not DB_REPLICA_HOSTS and sys.argv[1:2] == ['test']:
+    # Nos testes, uma réplica que espelha o banco de testes exercita o roteamento
+    DATABASES['replica1'] = {**_DATABASE, 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['BlogApp.routers.ReplicaRouter']
+
+
+# Cache
+# Usa Redis quando REDIS_URL está definido; caso contrário, cache em memória local (testes e dev)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Tempo de vida (segundos) das páginas de feed e detalhes de post em cache
+BLOG_CACHE_TIMEOUT = config('BLOG_CACHE_TIMEOUT', default=300, cast=int)
+
+
+# Timeline 'seguindo': autores com mais seguidores que isto não fazem fan-out na escrita;
+# seus posts são buscados na leitura
+TIMELINE_FANOUT_MAX_FOLLOWERS = config('TIMELINE_FANOUT_MAX_FOLLOWERS', default=10000, cast=int)
+# Quantos posts recentes entram na timeline de quem acabou de seguir um autor
+TIMELINE_BACKFILL_SIZE = 20
+
+# Busca (ver BlogApp.search): configuração de idioma do full-text search do PostgreSQL
+SEARCH_CONFIG = config('SEARCH_CONFIG', default='portuguese')
+
+
+# Fila de tarefas em segundo plano (manage.py run_worker). Nos testes as tarefas rodam na hora
+JOB_QUEUE_EAGER = config('JOB_QUEUE_EAGER', default=False, cast=bool) or sys.argv[1:2] == ['test']
+
+
+# Limites de queries por nome de view, para views sem o atributo query_budget.
+# Nos testes um request acima do limite falha; em produção só gera um aviso no log
+QUERY_BUDGETS = {}
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool) or sys.argv[1:2] == ['test']
+
+# Token do coletor do Prometheus para /metrics/ (Authorization: Bearer <token>); sem ele, só staff lê as métricas.
+# Não há liberação por IP: atrás de um proxy reverso todo request chega de 127.0.0.1
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
 
 
 # Password validation
@@ -105,6 +178,47 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Algoritmo das senhas: scrypt, argon2 (requer argon2-cffi) ou pbkdf2. Hashes em outro
+# algoritmo continuam válidos e são convertidos no próximo login bem-sucedido
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='scrypt')
+_PASSWORD_HASHERS = {
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for hasher in (
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    )
+    if hasher != _PASSWORD_HASHERS[PASSWORD_HASHER]
+]
+
+# Login (ver BlogApp.auth): falhas aceitas por IP e por conta dentro da janela (segundos);
+# acima disso o login é recusado antes de calcular o hash da senha
+LOGIN_THROTTLE_WINDOW = config('LOGIN_THROTTLE_WINDOW', default=300, cast=int)
+LOGIN_MAX_FAILURES_PER_IP = config('LOGIN_MAX_FAILURES_PER_IP', default=50, cast=int)
+LOGIN_MAX_FAILURES_PER_ACCOUNT = config('LOGIN_MAX_FAILURES_PER_ACCOUNT', default=5, cast=int)
+# Proxies reversos confiáveis na frente da aplicação (nginx, balanceador). Com 0, o IP do limite é o REMOTE_ADDR;
+# com N, é o endereço que o proxy mais externo viu, o N-ésimo da direita em X-Forwarded-For. Sem isto, atrás de
+# um proxy todos os logins vêm do mesmo IP e as falhas de qualquer um bloqueiam o site inteiro
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
+# Sessões: 'cached_db' lê do cache e grava no banco e no cache, só quando o conteúdo muda (BlogApp.sessions);
+# 'signed_cookies' guarda a sessão inteira no cookie, sem banco nem cache (serve a sessões pequenas, como as
+# deste app: usuário e hash); 'db' é a sessão padrão do Django, uma query por request
+SESSION_BACKEND = config('SESSION_BACKEND', default='cached_db')
+SESSION_ENGINE = {
+    'cached_db': 'BlogApp.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_BACKEND]
+# Por quantos segundos o usuário de uma sessão fica em cache (sai antes disso se for alterado)
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -130,6 +244,29 @@ STATICFILES_DIRS = [
 # Configuração de arquivos de mídia (opcional, se você usar uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'BlogApp/static/media')
+# Cache-Control das fotos enviadas; em produção, replicar no servidor que entrega /media/
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=60 * 60 * 24 * 365, cast=int)
+
+# Fotos gravadas uma única vez por conteúdo (ver BlogApp.storage): 'filesystem' em MEDIA_ROOT ou 's3'
+# (S3 ou compatível, como o MinIO, quando há vários servidores); MEDIA_S3_PUBLIC_URL é a base das URLs
+MEDIA_STORAGE = config('MEDIA_STORAGE', default='filesystem')
+MEDIA_S3_BUCKET = config('MEDIA_S3_BUCKET', default='blog-media')
+MEDIA_S3_ENDPOINT_URL = config('MEDIA_S3_ENDPOINT_URL', default='')  # ex.: http://localhost:9000 (MinIO)
+MEDIA_S3_ACCESS_KEY = config('MEDIA_S3_ACCESS_KEY', default='')
+MEDIA_S3_SECRET_KEY = config('MEDIA_S3_SECRET_KEY', default='')
+MEDIA_S3_REGION = config('MEDIA_S3_REGION', default='')
+MEDIA_S3_PUBLIC_URL = config('MEDIA_S3_PUBLIC_URL', default='')
+STORAGES = {
+    'default': {
+        'BACKEND': {
+            'filesystem': 'BlogApp.storage.ContentAddressedFileSystemStorage',
+            's3': 'BlogApp.storage.ContentAddressedS3Storage',
+        }[MEDIA_STORAGE],
+    },
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Uploads vão para disco em blocos, com o sha256 calculado durante o recebimento
+FILE_UPLOAD_HANDLERS = ['BlogApp.storage.HashingUploadHandler']
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -148,11 +285,33 @@ CORS_ALLOWED_ORIGINS = []
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Tokens da API (ver api.authentication): por quanto tempo token -> usuário fica em cache e,
+# se maior que zero, em quantos segundos um token expira
+API_TOKEN_CACHE_TIMEOUT = config('API_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+API_TOKEN_TTL = config('API_TOKEN_TTL', default=0, cast=int)
+
+# Rotas de leitura da API servidas pelas views assíncronas de api.async_views (rodando em ASGI,
+# ex.: uvicorn Blog.asgi:application), por nome: api_post_list_create, api_post_detail, profile_detail
+ASYNC_API_ROUTES = config('ASYNC_API_ROUTES', default='', cast=lambda v: [name.strip() for name in v.split(',') if name.strip()])
+
+# Eventos em tempo real (BlogApp.realtime, /api/events/ em ASGI): broker em memória num único processo,
+# Redis (REDIS_URL) com vários processos ou servidores; fila por conexão, keep-alive (s) e tópicos por conexão
+REALTIME_BROKER = config(
+    'REALTIME_BROKER', default='BlogApp.realtime.RedisBroker' if REDIS_URL else 'BlogApp.realtime.InMemoryBroker',
+)
+REALTIME_QUEUE_SIZE = config('REALTIME_QUEUE_SIZE', default=100, cast=int)
+REALTIME_KEEPALIVE = config('REALTIME_KEEPALIVE', default=15, cast=int)
+REALTIME_MAX_TOPICS = config('REALTIME_MAX_TOPICS', default=100, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',  # TokenAuthentication com cache token -> usuário
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Apenas usuários autenticados
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',  # Mesmo JSON do JSONRenderer, gerado pelo orjson
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
@@ -1,16 +1,27 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, re_path, include
 from django.conf import settings
+from django.conf.urls.static import static
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
+from BlogApp.instrumentation import metrics_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('BlogApp.urls')),
     path('api/', include('api.urls')),
-    path('api-auth/', include('rest_framework.urls'))
+    path('api-auth/', include('rest_framework.urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Uploads nunca são sobrescritos (o storage gera um nome novo), então podem ficar em cache
+    # por MEDIA_CACHE_MAX_AGE; serve() já responde 304 a If-Modified-Since.
+    media = cache_control(public=True, max_age=settings.MEDIA_CACHE_MAX_AGE, immutable=True)(serve)
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', media, {'document_root': settings.MEDIA_ROOT}),
+    ]
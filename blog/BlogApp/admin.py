@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import Post, Follow, Comment, Profile, Like
+from .models import Post, Follow, Comment, Profile, Like, Job, MediaBlob
 
 class LikeAdmin(admin.ModelAdmin):
-    list_display=('user', 'post')
+    list_display=('user', 'post', 'created_at')
     
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'followers_count')
+    list_display = ('user', 'followers_count', 'following_count')
     
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('follower', 'following')
@@ -13,6 +13,13 @@ class FollowAdmin(admin.ModelAdmin):
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('post','author','content','created_at')
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at')
+
 class PostAdmin(admin.ModelAdmin):
     list_display = ('title', 'created_at', 'photo_post', 'updated_at', 'get_author', 'get_likes_count')
 
@@ -21,7 +28,7 @@ class PostAdmin(admin.ModelAdmin):
     get_author.short_description = 'Author'
 
     def get_likes_count(self, obj):
-        return obj.likes.count()  # Supondo que likes seja um campo de muitos-para-muitos
+        return obj.likes_count  # Contagem desnormalizada, sem COUNT por linha
     get_likes_count.short_description = 'Likes Count'
 
 admin.site.register(Follow, FollowAdmin)
@@ -29,3 +36,5 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Like, LikeAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(MediaBlob, MediaBlobAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BlogappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'BlogApp'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401  (registra os receivers e as tarefas da fila)
@@ -0,0 +1,154 @@
+import hashlib
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, authenticate
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.functions import Lower
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from . import routers
+
+IP_FAILURES_KEY = 'auth:failures:ip:{}'
+ACCOUNT_FAILURES_KEY = 'auth:failures:account:{}'
+USER_KEY = 'auth:user:{}'
+
+
+class LoginThrottled(Exception):
+    """Falhas demais para o IP ou a conta: o login é recusado sem calcular o hash da senha."""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def find_by_email(email):
+    """Busca o usuário pelo e-mail sem diferenciar maiúsculas, pelo índice em LOWER(email)."""
+    if not email:
+        return None
+    return (
+        User.objects.alias(email_lower=Lower('email'))
+        .filter(email_lower=email.strip().lower())
+        .order_by('id')
+        .first()
+    )
+
+
+def client_ip(request):
+    """IP do cliente para o limite de falhas, considerando TRUSTED_PROXY_COUNT proxies na frente."""
+    remote = request.META.get('REMOTE_ADDR', '')
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if not proxies:
+        return remote
+    # Cada proxy acrescenta à direita quem se conectou a ele; o que vem antes o cliente pode forjar
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    # Com menos entradas que proxies, o request não passou por todos eles: vale quem se conectou
+    return forwarded[-proxies] if len(forwarded) >= proxies else remote
+
+
+def _failure_keys(ip, account):
+    account = hashlib.sha256(account.strip().lower().encode()).hexdigest()
+    return (
+        (IP_FAILURES_KEY.format(ip), settings.LOGIN_MAX_FAILURES_PER_IP),
+        (ACCOUNT_FAILURES_KEY.format(account), settings.LOGIN_MAX_FAILURES_PER_ACCOUNT),
+    )
+
+
+def check_throttle(ip, account):
+    keys = _failure_keys(ip, account)
+    failures = cache.get_many([key for key, _ in keys])
+    if any(failures.get(key, 0) >= limit for key, limit in keys):
+        raise LoginThrottled(settings.LOGIN_THROTTLE_WINDOW)
+
+
+def record_failure(ip, account):
+    for key, _ in _failure_keys(ip, account):
+        # add() abre a janela só na primeira falha; as seguintes não a estendem
+        cache.add(key, 0, settings.LOGIN_THROTTLE_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, settings.LOGIN_THROTTLE_WINDOW)
+
+
+def login_attempt(request, password, username=None, email=None):
+    """Autentica por nome de usuário ou e-mail, com limite de falhas por IP e por conta.
+
+    O limite é conferido antes de qualquer hash, então rajadas de tentativas erradas custam
+    só leituras de cache. Um login bem-sucedido zera as falhas da conta; o hash da senha é
+    convertido para o algoritmo de PASSWORD_HASHER pelo próprio authenticate().
+    Retorna o usuário ou None; levanta LoginThrottled.
+    """
+    account = email if email is not None else username or ''
+    ip = client_ip(request)
+    check_throttle(ip, account)
+
+    if email is not None:
+        user = find_by_email(email)
+        username = user.username if user is not None else None
+    user = authenticate(request, username=username, password=password) if username else None
+
+    if user is None:
+        record_failure(ip, account)
+    else:
+        cache.delete(_failure_keys(ip, account)[1][0])
+    return user
+
+
+def user_cache_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def get_user(request):
+    """auth.get_user() com o usuário da sessão vindo do cache, sem a query em auth_user a cada página.
+
+    A entrada é por usuário (as sessões dele a compartilham) e sai do cache quando ele é salvo.
+    O hash de autenticação da sessão é conferido contra o usuário em cache, então trocar a senha
+    continua derrubando as outras sessões; qualquer divergência segue o caminho do Django.
+    """
+    session = request.session
+    try:
+        key = user_cache_key(session[SESSION_KEY])
+        backend_path = session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    user = cache.get(key)
+    if (
+        user is not None
+        and backend_path in settings.AUTHENTICATION_BACKENDS
+        and constant_time_compare(session.get(HASH_SESSION_KEY, ''), user.get_session_auth_hash())
+    ):
+        return user
+    with routers.primary():  # O usuário recém-alterado, e não a cópia atrasada da réplica, vai para o cache
+        user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def acached_user(request):
+    return await sync_to_async(cached_user)(request)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware com request.user (e request.auser()) de get_user()."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: cached_user(request))
+        request.auser = partial(acached_user, request)
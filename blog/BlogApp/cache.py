@@ -0,0 +1,106 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import primary
+
+# As chaves carregam um número de versão; invalidar é só incrementar a versão,
+# e as entradas antigas expiram sozinhas pelo timeout.
+FEED_VERSION_KEY = 'blog:feed:version'
+POST_VERSION_KEY = 'blog:post:{}:version'
+HITS_KEY = 'blog:cache:hits'
+MISSES_KEY = 'blog:cache:misses'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def _digest(parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def feed_version():
+    """Muda a cada escrita que altere o feed (posts, comentários, likes, follows, perfis)."""
+    return _version(FEED_VERSION_KEY)
+
+
+def post_version(post_id):
+    """Muda a cada escrita no post, em seus comentários ou likes."""
+    return _version(POST_VERSION_KEY.format(post_id))
+
+
+def feed_key(*parts):
+    """Chave de uma página do feed, válida até a próxima escrita que altere o feed."""
+    return f'blog:feed:{feed_version()}:{_digest(parts)}'
+
+
+def post_key(post_id, *parts):
+    """Chave de dados de um post, válida até a próxima escrita nesse post."""
+    return f'blog:post:{post_id}:{post_version(post_id)}:{_digest(parts)}'
+
+
+def invalidate_feed():
+    _bump(FEED_VERSION_KEY)
+
+
+def invalidate_post(post_id):
+    _bump(POST_VERSION_KEY.format(post_id))
+    invalidate_feed()
+
+
+def cached(key, compute, timeout=None):
+    """Retorna o valor em cache para key, ou calcula com compute() e guarda."""
+    value = cache.get(key)
+    if value is not None:
+        _incr(HITS_KEY)
+        return value
+    _incr(MISSES_KEY)
+    with primary():  # Nada lido de uma réplica atrasada fica no cache sob a versão nova
+        value = compute()
+    cache.set(key, value, settings.BLOG_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+async def acached(key, compute, timeout=None):
+    """cached() para as views assíncronas: compute é uma função assíncrona."""
+    value = await cache.aget(key)
+    if value is not None:
+        await sync_to_async(_incr)(HITS_KEY)
+        return value
+    await sync_to_async(_incr)(MISSES_KEY)
+    with primary():
+        value = await compute()
+    await cache.aset(key, value, settings.BLOG_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,99 @@
+import base64
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Post, Comment, Like, Follow
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Tipo exportado: (queryset, campos). Posts avançam por (updated_at, id); os demais, só inseridos, por id
+EXPORTS = {
+    'posts': (Post.objects.all(), ('id', 'title', 'subscription', 'photo_post', 'author_id', 'created_at', 'updated_at', 'likes_count')),
+    'comments': (Comment.objects.all(), ('id', 'post_id', 'author_id', 'content', 'created_at')),
+    'likes': (Like.objects.all(), ('id', 'user_id', 'post_id', 'created_at')),
+    'follows': (Follow.objects.all(), ('id', 'follower_id', 'following_id')),
+}
+EXPORT_TYPES = tuple(EXPORTS)
+
+
+def encode_watermark(watermark):
+    # isoformat() em vez do DjangoJSONEncoder, que corta os microssegundos e repetiria a última linha
+    watermark = {
+        name: (position[0].isoformat(), position[1]) if name == 'posts' else position
+        for name, position in watermark.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(watermark).encode()).decode()
+
+
+def decode_watermark(token):
+    """Converte o token de uma exportação anterior em {tipo: posição}. Levanta ValueError se for inválido."""
+    try:
+        watermark = json.loads(base64.urlsafe_b64decode(token.encode()))
+        decoded = {}
+        for name, position in watermark.items():
+            if name not in EXPORTS:
+                raise ValueError(name)
+            if name == 'posts':
+                updated_at, post_id = position
+                decoded[name] = (parse_datetime(updated_at), int(post_id))
+                if decoded[name][0] is None:
+                    raise ValueError(updated_at)
+            else:
+                decoded[name] = int(position)
+        return decoded
+    except (TypeError, AttributeError, json.JSONDecodeError, UnicodeDecodeError, base64.binascii.Error) as exc:
+        raise ValueError(token) from exc
+
+
+def _after(name, position):
+    if name == 'posts':
+        updated_at, post_id = position
+        return Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=post_id)
+    return Q(id__gt=position)
+
+
+def records(types=EXPORT_TYPES, watermark=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Percorre os tipos pedidos com cursores do lado do servidor, um dicionário por linha.
+
+    Só entram as linhas posteriores ao watermark. O último registro é
+    {'type': 'watermark', ...} com o token para a próxima exportação incremental.
+    Exclusões não são exportadas, e likes_count só muda com o post salvo via save().
+    """
+    watermark = dict(watermark or {})
+    for name in types:
+        queryset, fields = EXPORTS[name]
+        ordering = ('updated_at', 'id') if name == 'posts' else ('id',)
+        queryset = queryset.order_by(*ordering)
+        if name in watermark:
+            queryset = queryset.filter(_after(name, watermark[name]))
+        row = None
+        for row in queryset.values(*fields).iterator(chunk_size=chunk_size):
+            yield {'type': name[:-1], **row}
+        if row is not None:
+            watermark[name] = (row['updated_at'], row['id']) if name == 'posts' else row['id']
+    yield {'type': 'watermark', 'watermark': encode_watermark(watermark)}
+
+
+def ndjson(rows):
+    """Serializa cada registro como uma linha JSON, sem acumular a saída."""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b'\n'
+
+
+def gzipped(chunks, flush_every=64 * 1024):
+    """Comprime o fluxo em gzip à medida que é gerado, liberando blocos de até flush_every bytes."""
+    compressor = zlib.compressobj(wbits=31)  # 31: cabeçalho e trailer gzip
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_every:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
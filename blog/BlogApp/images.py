@@ -0,0 +1,88 @@
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Larguras (px) geradas para cada imagem enviada, e os formatos de cada variante
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(name, width, ext):
+    """img/foto.png -> img/foto.640w.webp, ao lado do original (num storage endereçado por conteúdo, só a extensão conta)."""
+    root, _ = os.path.splitext(name)
+    return f'{root}.{width}w.{ext}'
+
+
+def needs_variants(field_file, variants):
+    return bool(field_file) and (variants or {}).get('source') != field_file.name
+
+
+def generate_variants(field_file):
+    """Gera as variantes redimensionadas de field_file e retorna o mapa {formato: {largura: nome}}."""
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    variants = {'source': field_file.name}
+    widths = sorted({min(width, image.width) for width in VARIANT_WIDTHS})
+    for ext, (pil_format, options) in VARIANT_FORMATS.items():
+        variants[ext] = {}
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            if pil_format == 'JPEG' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = variant_name(field_file.name, width, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[ext][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def variant_names(variants):
+    return {name for ext in VARIANT_FORMATS for name in (variants or {}).get(ext, {}).values()}
+
+
+def delete_variants(storage, variants, keep=None):
+    names = variant_names(variants)
+    if not getattr(storage, 'content_addressed', False):
+        # Com nomes fixos, a variante regerada sobrescreveu a antiga; com blobs, cada save() foi uma nova referência
+        names -= variant_names(keep)
+    for name in names:
+        storage.delete(name)
+
+
+def srcset(storage, variants, build_url=None):
+    """Monta {formato: 'url 320w, url 640w'} a partir do mapa de variantes."""
+    result = {}
+    for ext in VARIANT_FORMATS:
+        names = (variants or {}).get(ext)
+        if names:
+            urls = ((storage.url(name), width) for width, name in sorted(names.items(), key=lambda item: int(item[0])))
+            result[ext] = ', '.join(f'{build_url(url) if build_url else url} {width}w' for url, width in urls)
+    return result
+
+
+def build_variants(model_label, pk, field_name, variants_field, force=False):
+    """Gera as variantes de uma instância (com force, mesmo as já atualizadas) e grava o mapa em variants_field."""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    old_variants = getattr(instance, variants_field)
+    if not (force and field_file) and not needs_variants(field_file, old_variants):
+        return
+    new_variants = generate_variants(field_file)
+    setattr(instance, variants_field, new_variants)
+    instance.save(update_fields=[variants_field])
+    delete_variants(field_file.storage, old_variants, keep=new_variants)
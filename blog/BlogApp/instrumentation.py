@@ -0,0 +1,186 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Normaliza a SQL trocando literais por '?', para agrupar queries repetidas."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper que conta as queries, o tempo de banco e as repetidas de um request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: total for sql, total in self.fingerprints.items() if total > 1}
+
+
+class Metrics:
+    """Agregados por view, mantidos em memória no processo."""
+
+    FIELDS = ('requests', 'duration', 'db_duration', 'queries', 'duplicate_queries', 'budget_exceeded')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.views = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def record(self, view, duration, recorder, exceeded):
+        with self.lock:
+            stats = self.views[view]
+            stats['requests'] += 1
+            stats['duration'] += duration
+            stats['db_duration'] += recorder.duration
+            stats['queries'] += recorder.count
+            stats['duplicate_queries'] += sum(total - 1 for total in recorder.duplicates.values())
+            stats['budget_exceeded'] += int(exceeded)
+
+    def render(self):
+        """Exporta os agregados no formato texto do Prometheus."""
+        series = (
+            ('blog_view_requests_total', 'counter', 'Requests atendidos.', 'requests'),
+            ('blog_view_duration_seconds_sum', 'counter', 'Tempo total de resposta.', 'duration'),
+            ('blog_view_db_duration_seconds_sum', 'counter', 'Tempo total gasto no banco.', 'db_duration'),
+            ('blog_view_queries_total', 'counter', 'Queries executadas.', 'queries'),
+            ('blog_view_duplicate_queries_total', 'counter', 'Queries repetidas no mesmo request.', 'duplicate_queries'),
+            ('blog_view_query_budget_exceeded_total', 'counter', 'Requests acima do limite de queries.', 'budget_exceeded'),
+        )
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+            for name, kind, description, field in series:
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                for view, stats in views:
+                    lines.append(f'{name}{{view="{view}"}} {round(stats[field], 6)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def query_budget(request):
+    """Limite de queries da view: atributo query_budget da view ou QUERY_BUDGETS[nome da view].
+
+    O limite pode ser um inteiro ou um dicionário por método HTTP.
+    """
+    match = request.resolver_match
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if budget is None:
+        budget = settings.QUERY_BUDGETS.get(match.url_name)
+    if isinstance(budget, dict):
+        budget = budget.get(request.method)
+    return budget
+
+
+class PerformanceMiddleware:
+    """Mede tempo total, tempo de banco e queries de cada request e confere o limite da view."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with self.record_queries(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # No ASGI o ORM roda na thread de sync_to_async do request, com conexões próprias:
+        # o wrapper é instalado nelas, e não nas da thread do event loop
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        stack = await sync_to_async(self.record_queries)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    @staticmethod
+    def record_queries(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def finish(self, request, response, recorder, duration):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        budget = query_budget(request)
+        exceeded = budget is not None and recorder.count > budget
+        metrics.record(view, duration, recorder, exceeded)
+
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+            f'total;dur={duration * 1000:.1f}'
+        )
+
+        if exceeded:
+            message = (
+                f"{view}: {recorder.count} queries, limite {budget}. "
+                f"Repetidas: {recorder.duplicates or 'nenhuma'}"
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def metrics_view(request):
+    """Endpoint de métricas no formato do Prometheus, para o coletor (METRICS_TOKEN) ou staff."""
+    user = getattr(request, 'user', None)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    by_token = bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and constant_time_compare(token, settings.METRICS_TOKEN)
+    if not by_token and not (user and user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,94 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Por quanto tempo um job fica reservado para um worker antes de poder ser retomado por outro
+LEASE = timedelta(minutes=5)
+
+_registry = {}
+
+
+def task(name):
+    """Registra a função como tarefa da fila, com o nome informado."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, max_attempts=5, **payload):
+    """Coloca uma tarefa na fila.
+
+    O job é gravado na transação corrente, então só fica visível para os workers após o
+    commit. Um idempotency key igual ao de um job pendente ou em execução é ignorado; o de um
+    job já concluído ou falho enfileira de novo. Com JOB_QUEUE_EAGER a tarefa roda na hora.
+    """
+    if name not in _registry:
+        raise KeyError(f"Tarefa desconhecida: {name}")
+    if settings.JOB_QUEUE_EAGER:
+        _registry[name](**payload)
+        return None
+    job = Job(name=name, payload=payload, idempotency_key=key, max_attempts=max_attempts)
+    Job.objects.bulk_create([job], ignore_conflicts=key is not None)
+    return job
+
+
+def prune(older_than, batch_size=10000):
+    """Apaga, em lotes, os jobs concluídos ou falhos atualizados antes de older_than. Retorna quantos."""
+    finished = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], updated_at__lt=older_than)
+    total = 0
+    while ids := list(finished.values_list('id', flat=True)[:batch_size]):
+        total += Job.objects.filter(pk__in=ids).delete()[0]
+    return total
+
+
+def claim(batch_size):
+    """Reserva até batch_size jobs prontos para rodar, sem bloquear outros workers."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.PENDING) | Q(status=Job.RUNNING), run_after__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING, run_after=now + LEASE, updated_at=now,
+            )
+    return jobs
+
+
+def run(job):
+    """Executa um job reservado, reagendando com backoff exponencial em caso de erro."""
+    job.attempts += 1
+    try:
+        _registry[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.error("Job %s (%s) falhou definitivamente", job.pk, job.name)
+        else:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=2 ** job.attempts)
+    else:
+        job.status = Job.DONE
+    job.save(update_fields=['status', 'attempts', 'run_after', 'last_error', 'updated_at'])
+    return job.status == Job.DONE
+
+
+def run_pending(batch_size=100):
+    """Processa um lote de jobs. Retorna quantos foram reservados."""
+    jobs = claim(batch_size)
+    for job in jobs:
+        run(job)
+    return len(jobs)
@@ -0,0 +1,229 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, issue_token
+from api.projections import comment_rows, post_rows, serialize_posts
+from api.renderers import ORJSONRenderer
+from api.serializers import PostSerializer
+from BlogApp import search
+from BlogApp.models import Post, Follow, Comment, Like
+
+# Nome de cada micro-benchmark e o método que o executa
+BENCHMARKS = (
+    'post_serializer',
+    'post_projection',
+    'render_json',
+    'render_orjson',
+    'home_view_cold',
+    'home_view_warm',
+    'api_feed_cold',
+    'like_toggle',
+    'follow_toggle',
+    'token_login',
+    'login_attack',
+    'token_auth_stock',
+    'token_auth_cached',
+    'search',
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda os micro-benchmarks (serializer e projeção do feed, renderização JSON, HomeView, feed da API, like/follow, login, ataque de força bruta, autenticação por token e busca) "
+        "sobre os dados de seed_blog e grava os resultados em JSON para comparar entre commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='+', choices=BENCHMARKS)
+        parser.add_argument('--output', help="Arquivo JSON de saída.")
+        parser.add_argument('--compare', help="JSON de uma execução anterior para comparar as medianas.")
+        parser.add_argument('--password', default='benchmark', help="Senha usada em seed_blog.")
+
+    def handle(self, *args, **options):
+        self.password = options['password']
+        self.user = User.objects.filter(username__startswith='bench').order_by('id').first()
+        self.post = Post.objects.order_by('-likes_count').first()
+        self.target = User.objects.filter(username__startswith='bench').exclude(pk=getattr(self.user, 'pk', None)).first()
+        if self.user is None or self.post is None or self.target is None:
+            raise CommandError("Banco sem dados de benchmark: rode 'manage.py seed_blog' antes.")
+
+        results = {}
+        # As escritas dos benchmarks são desfeitas ao final; o custo de commit fica de fora
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+                for name in options['only'] or BENCHMARKS:
+                    results[name] = self.measure(getattr(self, f'bench_{name}'), options['repeat'], options['warmup'])
+                    self.stdout.write(
+                        f"{name:<18} mediana {results[name]['median_ms']:>8.2f} ms  "
+                        f"p95 {results[name]['p95_ms']:>8.2f} ms  {results[name]['queries']:>3} queries"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+        report = {
+            'commit': self.git_commit(),
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'likes': Like.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def measure(self, func, repeat, warmup):
+        for _ in range(warmup):
+            func()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        timings.sort()
+        return {
+            'repeat': repeat,
+            'median_ms': round(statistics.median(timings), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'min_ms': round(timings[0], 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'queries': len(ctx),
+        }
+
+    def compare(self, path, results):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)['results']
+        for name, result in results.items():
+            if name in previous:
+                before = previous[name]['median_ms']
+                change = (result['median_ms'] - before) / before * 100 if before else 0
+                self.stdout.write(f"{name:<18} {before:>8.2f} -> {result['median_ms']:>8.2f} ms ({change:+.1f}%)")
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # Benchmarks
+
+    def bench_post_serializer(self):
+        request = APIRequestFactory().get('/api/posts/')
+        request.user = self.user
+        posts = list(Post.objects.for_feed().order_by('-created_at', '-id')[:20])
+        return PostSerializer(posts, many=True, context={'request': request}).data
+
+    def bench_post_projection(self):
+        # A mesma página de post_serializer, pelo caminho do feed da API (api.projections)
+        request = APIRequestFactory().get('/api/posts/')
+        request.user = self.user
+        posts = list(post_rows(Post.objects.order_by('-created_at', '-id'))[:20])
+        liked = Like.liked_post_ids(self.user, [post['id'] for post in posts])
+        return serialize_posts(posts, comment_rows([post['id'] for post in posts]), request, liked)
+
+    def bench_render_json(self):
+        return JSONRenderer().render(self.feed_page)
+
+    def bench_render_orjson(self):
+        return ORJSONRenderer().render(self.feed_page)
+
+    def bench_home_view_cold(self):
+        cache.clear()
+        return self.home_client.get('/')
+
+    def bench_home_view_warm(self):
+        return self.home_client.get('/')
+
+    def bench_api_feed_cold(self):
+        cache.clear()
+        return self.api_client.get('/api/posts/')
+
+    def bench_like_toggle(self):
+        # Curte e descurte, deixando o estado como estava
+        self.post.toggle_like(self.user)
+        self.post.toggle_like(self.user)
+
+    def bench_follow_toggle(self):
+        Follow.toggle(self.user, self.target)
+        Follow.toggle(self.user, self.target)
+
+    def bench_token_login(self):
+        return Client().post('/api/token/', {'username': self.user.username, 'password': self.password})
+
+    def bench_login_attack(self):
+        # Senha errada de um IP próprio: passado o limite de falhas, a recusa não calcula hash
+        return Client().post(
+            '/api/token/', {'username': self.user.username, 'password': 'errada'}, REMOTE_ADDR='203.0.113.7',
+        )
+
+    def bench_token_auth_stock(self):
+        return TokenAuthentication().authenticate(self.token_request)
+
+    def bench_token_auth_cached(self):
+        return CachedTokenAuthentication().authenticate(self.token_request)
+
+    def bench_search(self):
+        # 'Lorem' está em todos os posts de seed_blog: pior caso de ranqueamento
+        return search.search_posts('lorem ipsum')
+
+    @property
+    def feed_page(self):
+        if not hasattr(self, '_feed_page'):
+            self._feed_page = {'next': None, 'previous': None, 'results': self.bench_post_projection()}
+        return self._feed_page
+
+    @property
+    def home_client(self):
+        if not hasattr(self, '_home_client'):
+            self._home_client = Client()
+            self._home_client.force_login(self.user)
+        return self._home_client
+
+    @property
+    def token_request(self):
+        if not hasattr(self, '_token_request'):
+            token = issue_token(self.user)
+            self._token_request = APIRequestFactory().get('/api/posts/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        return self._token_request
+
+    @property
+    def api_client(self):
+        if not hasattr(self, '_api_client'):
+            self._api_client = APIClient()
+            self._api_client.force_authenticate(self.user)
+        return self._api_client
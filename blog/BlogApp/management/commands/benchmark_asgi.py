@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+from api.authentication import issue_token
+from BlogApp.models import Post
+
+# Rotas de leitura com versão assíncrona (nomes de ASYNC_API_ROUTES)
+ROUTES = ('api_post_list_create', 'api_post_detail', 'profile_detail')
+
+# Servidor, views e como os requests simultâneos são atendidos
+MODES = (
+    ('wsgi', False),  # WSGIHandler, views DRF, uma thread por request (como gunicorn --threads)
+    ('asgi_sync', False),  # ASGIHandler, views DRF rodando em sync_to_async
+    ('asgi', True),  # ASGIHandler, views de api.async_views no event loop (como uvicorn)
+)
+
+
+@contextmanager
+def async_routes(enabled):
+    """Recarrega as URLs com ASYNC_API_ROUTES ligado ou desligado para todas as rotas de leitura."""
+    def reload():
+        clear_url_caches()
+        importlib.reload(importlib.import_module('api.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+
+    try:
+        with override_settings(ASYNC_API_ROUTES=list(ROUTES) if enabled else []):
+            reload()
+            yield
+    finally:
+        reload()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a vazão das rotas de leitura da API (feed, post, perfil) em WSGI e em ASGI com as views "
+        "assíncronas, com N requests simultâneos. Chama os handlers do Django direto, sem servidor nem rede: "
+        "para medir com uvicorn/gunicorn use benchmarks/locustfile.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 100, 500])
+        parser.add_argument('--requests', type=int, default=1000, help="Requests por medição.")
+        parser.add_argument('--routes', nargs='+', choices=ROUTES, default=list(ROUTES))
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username__startswith='bench', post__isnull=False, profile__isnull=False).order_by('id').first()
+        if user is None:
+            raise CommandError("Banco sem dados de benchmark: rode 'manage.py seed_blog' antes.")
+        post = Post.objects.filter(author=user).first()
+        paths = {
+            'api_post_list_create': '/api/posts/',
+            'api_post_detail': f'/api/posts/{post.pk}/',
+            'profile_detail': f'/api/profile/{user.profile.pk}/',
+        }
+        self.token = issue_token(user).key
+
+        self.stdout.write(f"{'rota':<22} {'modo':<10} {'simult.':>7} {'req/s':>9} {'p50':>9} {'p95':>9} {'erros':>6}")
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name in options['routes']:
+                for mode, enabled in MODES:
+                    with async_routes(enabled):
+                        for concurrency in options['concurrency']:
+                            run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+                            elapsed, timings, errors = run(paths[name], concurrency, options['requests'])
+                            timings.sort()
+                            self.stdout.write(
+                                f"{name:<22} {mode:<10} {concurrency:>7} {len(timings) / elapsed:>9.1f} "
+                                f"{statistics.median(timings):>6.1f} ms {timings[int(len(timings) * 0.95)]:>6.1f} ms {errors:>6}"
+                            )
+
+    def run_wsgi(self, path, concurrency, total):
+        handler = WSGIHandler()
+
+        def request():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Token {self.token}', 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            statuses = []
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: statuses.append(status))
+            b''.join(response)
+            response.close()  # request_finished: devolve a conexão da thread
+            return (time.perf_counter() - start) * 1000, statuses[0].startswith('200')
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda _: request(), range(total)))
+        return time.perf_counter() - start, [ms for ms, _ in results], sum(not ok for _, ok in results)
+
+    def run_asgi(self, path, concurrency, total):
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Token {self.token}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+
+        async def request(semaphore):
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            statuses = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.Event().wait()  # Cliente nunca desconecta; o handler cancela a espera
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                return (time.perf_counter() - start) * 1000, statuses[0] == 200
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(request(semaphore) for _ in range(total)))
+
+        start = time.perf_counter()
+        results = asyncio.run(main())
+        return time.perf_counter() - start, [ms for ms, _ in results], sum(not ok for _, ok in results)
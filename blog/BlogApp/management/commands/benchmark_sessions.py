@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from BlogApp.models import Post
+
+AUTH_MIDDLEWARE = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+CACHED_AUTH_MIDDLEWARE = 'BlogApp.auth.CachedAuthenticationMiddleware'
+
+# Sessão e middleware de autenticação de cada configuração
+MODES = (
+    ('db', 'django.contrib.sessions.backends.db', AUTH_MIDDLEWARE),  # Padrão do Django (antes)
+    ('cached_db', 'BlogApp.sessions', CACHED_AUTH_MIDDLEWARE),
+    ('signed_cookies', 'django.contrib.sessions.backends.signed_cookies', CACHED_AUTH_MIDDLEWARE),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Conta as idas ao banco por página (home, post, perfil e um comentário com mensagem) em cada "
+        "configuração de sessão: total, leituras/escritas de django_session e buscas do usuário logado. "
+        "Os comentários criados são desfeitos ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help="Requests por página e configuração.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username__startswith='bench', post__isnull=False, profile__isnull=False).order_by('id').first()
+        if user is None:
+            raise CommandError("Banco sem dados de benchmark: rode 'manage.py seed_blog' antes.")
+        post = Post.objects.filter(author=user).first()
+        pages = (
+            ('home', 'get', reverse('home'), {}, False),
+            ('post', 'get', reverse('post_detail', args=[post.pk]), {}, False),
+            ('perfil', 'get', f'/profile/{user.pk}/', {}, False),  # 'profile_detail' também é o nome da rota da API
+            # POST com messages.success, seguido do redirect que exibe a mensagem
+            ('comentário', 'post', reverse('post_detail', args=[post.pk]), {'content': 'Comentário de benchmark'}, True),
+        )
+
+        self.stdout.write(
+            f"{'página':<11} {'sessão':<15} {'queries':>8} {'sessão l/e':>11} {'usuário':>8} {'ms':>7}"
+        )
+        try:
+            with transaction.atomic():
+                for name, method, url, data, follow in pages:
+                    for mode, engine, middleware in MODES:
+                        self.stdout.write(self.run(name, mode, engine, middleware, method, url, data, follow, user, options['requests']))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, name, mode, engine, middleware, method, url, data, follow, user, total):
+        stack = [middleware if item in (AUTH_MIDDLEWARE, CACHED_AUTH_MIDDLEWARE) else item for item in settings.MIDDLEWARE]
+        # Mede, não confere: o limite de queries das views já conta com as sessões em cache
+        with override_settings(SESSION_ENGINE=engine, MIDDLEWARE=stack, ALLOWED_HOSTS=['testserver'], QUERY_BUDGET_RAISE=False):
+            client = Client()
+            client.force_login(user)
+            request = getattr(client, method)
+            request(url, data, follow=follow)  # Aquece os caches
+
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(total):
+                    request(url, data, follow=follow)
+            elapsed = (time.perf_counter() - start) * 1000 / total
+
+        sql = [query['sql'] for query in queries]
+        session = [query for query in sql if 'django_session' in query]
+        session_writes = sum(not query.lstrip().upper().startswith('SELECT') for query in session)
+        users = sum('FROM "auth_user" WHERE' in query for query in sql)
+        return (
+            f"{name:<11} {mode:<15} {len(sql) / total:>8.1f} "
+            f"{f'{(len(session) - session_writes) / total:.1f}/{session_writes / total:.1f}':>11} "
+            f"{users / total:>8.1f} {elapsed:>7.1f}"
+        )
@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from BlogApp import timeline
+from BlogApp.models import Post, Follow, Profile, TimelineEntry
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara fan-out na escrita (push) e na leitura (pull) para autores com N seguidores. "
+        "Os dados são criados em uma transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--posts', type=int, default=50, help="Posts já existentes do autor.")
+        parser.add_argument('--reads', type=int, default=20, help="Leituras de timeline por medição.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'seguidores':>10} {'push escrita':>14} {'push leitura':>14} {'pull leitura':>14}")
+        for followers in options['followers']:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(self.run(followers, options['posts'], options['reads']))
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, followers, posts, reads):
+        author = User.objects.create(username='bench_author')
+        Profile.objects.create(user=author, followers_count=followers)
+        users = User.objects.bulk_create(
+            [User(username=f'bench_follower_{i}') for i in range(followers)], batch_size=5000
+        )
+        Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=5000)
+        Follow.objects.bulk_create(
+            [Follow(follower=user, following=author) for user in users], batch_size=5000
+        )
+        existing = Post.objects.bulk_create(
+            [Post(title=f'Post {i}', subscription='...', author=author) for i in range(posts)]
+        )
+        reader = users[0]
+        # A caixa de entrada do leitor já contém os posts antigos do autor
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user=reader, post=post, created_at=post.created_at) for post in existing]
+        )
+
+        # Push: custo de escrita do fan-out de um post novo, e leitura da caixa de entrada
+        post = Post.objects.create(title='Novo', subscription='...', author=author)
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=followers):
+            start = time.perf_counter()
+            timeline.fan_out(post)
+            push_write = time.perf_counter() - start
+            push_read = self.time_reads(reader, reads)
+
+        # Pull: o autor fica acima do limite e seus posts são buscados na leitura
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=followers - 1):
+            timeline.remove_author(reader.id, author.id)
+            pull_read = self.time_reads(reader, reads)
+
+        return f"{followers:>10} {push_write * 1000:>11.1f} ms {push_read * 1000:>11.2f} ms {pull_read * 1000:>11.2f} ms"
+
+    @staticmethod
+    def time_reads(user, reads):
+        start = time.perf_counter()
+        for _ in range(reads):
+            timeline.read_timeline(user)
+        return (time.perf_counter() - start) / reads
@@ -0,0 +1,123 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from BlogApp.models import Post, Follow, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda EXPLAIN nas queries de leitura de cada view (feed, post, perfil, API) e das tarefas de timeline "
+        "e aponta varreduras sequenciais em tabelas acima de --threshold linhas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=int, default=10000, help="Linhas a partir das quais um seq scan é apontado.")
+        parser.add_argument('--check', action='store_true', help="Termina com erro se algum seq scan for apontado.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Mostra o plano de todas as queries.")
+
+    def handle(self, *args, **options):
+        self.threshold = options['threshold']
+        self.table_rows = {}
+        viewer = User.objects.filter(following_users__isnull=False).order_by('id').first()
+        # Um post do próprio usuário, para que as views de edição também respondam
+        post = Post.objects.filter(author=viewer).first() or Post.objects.order_by('-likes_count', '-id').first()
+        popular = Profile.objects.order_by('-followers_count').values_list('user_id', flat=True).first()
+        if viewer is None or post is None or popular is None:
+            raise CommandError("Banco sem dados: rode 'manage.py seed_blog' antes.")
+
+        flagged = 0
+        for name, queries in self.canonical_queries(viewer, post, popular):
+            for sql in queries:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                plan, scans = self.explain(sql)
+                for table, rows in scans:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f"{name}: seq scan em {table} (~{rows} linhas)\n  {sql}"))
+                if options['verbose_plans']:
+                    self.stdout.write(f"{name}: {sql}\n{plan}\n")
+            self.stdout.write(f"{name}: {len(queries)} queries analisadas")
+
+        if flagged and options['check']:
+            raise CommandError(f"{flagged} seq scan(s) acima de {self.threshold} linhas.")
+        self.stdout.write(self.style.SUCCESS(f"{flagged} seq scan(s) acima de {self.threshold} linhas."))
+
+    def canonical_queries(self, viewer, post, popular):
+        """Captura as queries que cada view executa de fato, sem cache, para um usuário com follows."""
+        pages = (
+            ('home', '/'),
+            ('post_detail', f'/post/{post.pk}'),
+            ('profile', f'/profile/{popular}/'),
+            ('api_feed', '/api/posts/'),
+            ('api_post_detail', f'/api/posts/{post.pk}/'),
+            ('api_timeline', '/api/timeline/'),
+            ('api_search', '/api/search/?q=lorem'),
+        )
+        client = Client()
+        client.force_login(viewer)
+        api_client = APIClient()
+        api_client.force_authenticate(viewer)
+        no_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(ALLOWED_HOSTS=['testserver'], CACHES=no_cache):
+            for name, url in pages:
+                with CaptureQueriesContext(connection) as ctx:
+                    (api_client if url.startswith('/api/') else client).get(url)
+                yield name, [query['sql'] for query in ctx.captured_queries]
+
+        # Caminho de segundo plano: seguidores de um autor no fan-out da timeline
+        with CaptureQueriesContext(connection) as ctx:
+            list(Follow.objects.filter(following_id=popular).values_list('follower_id', flat=True))
+        yield 'timeline.fan_out', [query['sql'] for query in ctx.captured_queries]
+
+    def explain(self, sql):
+        """Retorna (plano em texto, [(tabela, linhas)]) das varreduras sequenciais acima do limite."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                scans = [
+                    (node['Relation Name'], int(node['Plan Rows']))
+                    for node in self.plan_nodes(plan[0]['Plan'])
+                    if node['Node Type'] == 'Seq Scan' and node['Plan Rows'] >= self.threshold
+                ]
+                return json.dumps(plan, indent=2), scans
+
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+        # "SCAN tabela" lê a tabela inteira no SQLite. Com "USING INDEX" só é apontado se ainda
+        # houver ordenação em árvore temporária (o índice não entrega a ordem do LIMIT).
+        # Tabelas FTS5 (VIRTUAL TABLE) usam o próprio índice.
+        sorts = any(detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in details)
+        scans = []
+        for detail in details:
+            words = detail.split()
+            if len(words) < 2 or words[0] != 'SCAN' or 'VIRTUAL' in words:
+                continue
+            if 'USING' in words and not sorts:
+                continue
+            rows = self.count_rows(words[1])
+            if rows is not None and rows >= self.threshold:
+                scans.append((words[1], rows))
+        return '\n'.join(details), scans
+
+    def plan_nodes(self, node):
+        yield node
+        for child in node.get('Plans', ()):
+            yield from self.plan_nodes(child)
+
+    def count_rows(self, table):
+        if table not in self.table_rows:
+            if table not in connection.introspection.table_names():
+                self.table_rows[table] = None  # Alias de subquery ou tabela temporária
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                    self.table_rows[table] = cursor.fetchone()[0]
+        return self.table_rows[table]
@@ -0,0 +1,60 @@
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from BlogApp import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta posts, comentários, likes e follows em NDJSON, em streaming e com memória constante. "
+        "A última linha traz o watermark para a próxima exportação incremental (--since)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="Arquivo de saída ('-' para stdout). Termine em .gz para comprimir.")
+        parser.add_argument('--types', nargs='+', choices=export.EXPORT_TYPES, default=list(export.EXPORT_TYPES))
+        parser.add_argument('--since', help="Watermark de uma exportação anterior.")
+        parser.add_argument('--gzip', action='store_true', help="Comprime a saída em gzip.")
+        parser.add_argument('--chunk-size', type=int, default=export.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            watermark = export.decode_watermark(options['since']) if options['since'] else None
+        except ValueError:
+            raise CommandError("Watermark inválido.")
+
+        counts = Counter()
+        last = {}
+
+        def counted(rows):
+            for row in rows:
+                counts[row['type']] += 1
+                if row['type'] == 'watermark':
+                    last.update(row)
+                yield row
+
+        rows = counted(export.records(options['types'], watermark, options['chunk_size']))
+        chunks = export.ndjson(rows)
+        use_gzip = options['gzip'] or options['output'].endswith('.gz')
+        if use_gzip:
+            chunks = export.gzipped(chunks)
+
+        start = time.perf_counter()
+        if options['output'] != '-':
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        elif use_gzip:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+        elapsed = time.perf_counter() - start
+
+        del counts['watermark']
+        summary = ', '.join(f"{total} {name}" for name, total in counts.items()) or 'nada novo'
+        self.stderr.write(f"Exportado em {elapsed:.1f}s: {summary}. Próximo --since: {last['watermark']}")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from BlogApp import images
+from BlogApp.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas WebP/JPEG das fotos de posts e perfis que ainda não as têm."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regera também as miniaturas existentes.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        targets = (
+            (Post, 'photo_post', 'photo_post_variants'),
+            (Profile, 'photo', 'photo_variants'),
+        )
+        for model, field_name, variants_field in targets:
+            done = failed = 0
+            queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for instance in queryset.only('pk', field_name, variants_field).iterator(chunk_size=options['batch_size']):
+                if not options['force'] and not images.needs_variants(getattr(instance, field_name), getattr(instance, variants_field)):
+                    continue
+                try:
+                    images.build_variants(model._meta.label, instance.pk, field_name, variants_field, force=options['force'])
+                    done += 1
+                except (OSError, ValueError) as exc:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {instance.pk}: {exc}")
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {done} gerado(s), {failed} falha(s)."))
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from BlogApp import cache
+from BlogApp.models import Post, Comment, Like, Follow, Profile
+
+# Ordem de importação (as chaves estrangeiras apontam para entidades anteriores) e colunas aceitas
+ENTITIES = (
+    ('users', User, ('id', 'username', 'email', 'password', 'first_name', 'last_name', 'date_joined')),
+    ('posts', Post, ('id', 'title', 'subscription', 'photo_post', 'author_id', 'created_at', 'updated_at')),
+    ('comments', Comment, ('id', 'post_id', 'author_id', 'content', 'created_at')),
+    ('likes', Like, ('user_id', 'post_id', 'created_at')),
+    ('follows', Follow, ('follower_id', 'following_id')),
+)
+DATETIME_FIELDS = {'date_joined', 'created_at', 'updated_at'}
+
+
+def read_records(path):
+    """Lê um arquivo JSONL ou CSV registro a registro, sem carregá-lo inteiro."""
+    with open(path, newline='', encoding='utf-8') as source:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def copy_cell(field, obj):
+    """Valor de um campo como célula CSV do COPY: vazio para NULL, texto entre aspas para o resto."""
+    value = field.value_from_object(obj)
+    if value is None:
+        return ''
+    if isinstance(field, models.JSONField):
+        text = json.dumps(value, cls=field.encoder)  # value_to_string() devolve o próprio dict
+    else:
+        text = field.value_to_string(obj)
+    return '"' + text.replace('"', '""') + '"'
+
+
+def copy_buffer(fields, objects):
+    """Monta o CSV do COPY ... FROM STDIN para os objetos do lote."""
+    buffer = io.StringIO()
+    for obj in objects:
+        buffer.write(','.join(copy_cell(field, obj) for field in fields) + '\n')
+    buffer.seek(0)
+    return buffer
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """Desliga auto_now/auto_now_add para preservar as datas vindas do arquivo."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa usuários, posts, comentários, likes e follows de arquivos JSONL ou CSV, em lotes. "
+        "Usa COPY no PostgreSQL e bulk_create nos demais bancos; os contadores são recalculados uma vez no final."
+    )
+
+    def add_arguments(self, parser):
+        for name, _, columns in ENTITIES:
+            parser.add_argument(f'--{name}', metavar='ARQUIVO', help=f"Colunas: {', '.join(columns)}.")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--no-copy', action='store_true', help="Usa bulk_create mesmo no PostgreSQL.")
+        parser.add_argument(
+            '--default-password',
+            help="Senha para usuários sem 'password' no arquivo (calculada uma única vez). Sem ela, a senha fica inutilizável.",
+        )
+
+    def handle(self, *args, **options):
+        if not any(options[name] for name, _, _ in ENTITIES):
+            raise CommandError("Informe ao menos um arquivo (--users, --posts, --comments, --likes ou --follows).")
+
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        # Um único hash para todos os usuários sem senha no arquivo
+        self.default_password = make_password(options['default_password'])
+        self.now = timezone.now()
+        started = time.perf_counter()
+        total = 0
+
+        with transaction.atomic(), keep_timestamps(*(model for _, model, _ in ENTITIES)):
+            for name, model, columns in ENTITIES:
+                if not options[name]:
+                    continue
+                start = time.perf_counter()
+                rows = 0
+                for batch in batches(read_records(options[name]), options['batch_size']):
+                    objects = [self.build(model, columns, record) for record in batch]
+                    self.write(model, objects)
+                    if model is User:
+                        self.write(Profile, [Profile(user_id=user.pk) for user in objects])
+                    rows += len(objects)
+                elapsed = time.perf_counter() - start
+                total += rows
+                self.stdout.write(f"{name:<9} {rows:>10} linhas  {rows / elapsed if elapsed else 0:>10.0f} linhas/s")
+
+            self.reset_sequences()
+            # Os contadores desnormalizados e o índice de busca são recalculados uma vez, e não a cada linha
+            call_command('recount_likes', batch_size=options['batch_size'], stdout=self.stdout)
+            call_command('recount_comments', batch_size=options['batch_size'], stdout=self.stdout)
+            call_command('reconcile_follow_counts', batch_size=options['batch_size'], stdout=self.stdout)
+            call_command('rebuild_search_index', batch_size=options['batch_size'], stdout=self.stdout)
+            # Fotos importadas apontam para blobs já gravados: só as referências são contadas
+            call_command('reconcile_media', keep_orphans=True, stdout=self.stdout)
+
+        cache.invalidate_feed()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} linhas importadas em {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} linhas/s, "
+            f"{'COPY' if self.use_copy else 'bulk_create'})."
+        ))
+
+    def build(self, model, columns, record):
+        if model in (User, Post) and not record.get('id'):
+            # Outras entidades referenciam usuários e posts pelo id do arquivo
+            raise CommandError(f"Registro de {model.__name__} sem 'id': {record}")
+        values = {}
+        for column in columns:
+            value = record.get(column)
+            if value in (None, ''):
+                continue
+            if column in DATETIME_FIELDS and isinstance(value, str):
+                value = parse_datetime(value)
+            values[column] = value
+        if model is User:
+            values.setdefault('password', self.default_password)
+        for field in model._meta.concrete_fields:
+            if field.attname in DATETIME_FIELDS:
+                values.setdefault(field.attname, self.now)
+        return model(**values)
+
+    def write(self, model, objects):
+        if self.use_copy:
+            self.copy(model, objects)
+        else:
+            model.objects.bulk_create(objects)
+
+    def copy(self, model, objects):
+        """Grava o lote com COPY ... FROM STDIN (psycopg2 ou psycopg 3)."""
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not (field.primary_key and objects[0].pk is None)
+        ]
+        buffer = copy_buffer(fields, objects)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)'
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, 'copy_expert'):
+                cursor.cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def reset_sequences(self):
+        """Acerta as sequences depois de inserir ids explícitos."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [model for _, model, _ in ENTITIES] + [Profile])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from BlogApp import jobs
+
+
+class Command(BaseCommand):
+    help = "Apaga os jobs concluídos ou falhos mais antigos que --days dias (rodar periodicamente, ex.: cron diário)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        total = jobs.prune(timezone.now() - timedelta(days=options['days']), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} job(s) apagado(s)."))
@@ -0,0 +1,152 @@
+import asyncio
+import resource
+import statistics
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.authentication import issue_token
+from BlogApp.models import Post
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def server_rss(pid):
+    """Memória residente (MB) do processo do servidor, lida de /proc."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga dos eventos em tempo real: abre N conexões SSE ociosas em /api/events/ de um servidor "
+        "ASGI já rodando (ex.: uvicorn Blog.asgi:application), as mantém abertas, publica um like e mede em "
+        "quanto tempo todas recebem o evento. Usa os dados de seed_blog do mesmo banco do servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--ramp', type=int, default=500, help="Conexões abertas por segundo.")
+        parser.add_argument('--idle', type=int, default=30, help="Segundos com as conexões ociosas antes do like.")
+        parser.add_argument('--server-pid', type=int, help="PID do servidor, para medir a memória por conexão.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username__startswith='bench').order_by('id').first()
+        post = Post.objects.order_by('-likes_count').first()
+        if user is None or post is None:
+            raise CommandError("Banco sem dados de benchmark: rode 'manage.py seed_blog' antes.")
+        self.token = issue_token(user).key
+        self.post = post
+        url = urlsplit(options['url'])
+        self.base_url = options['url'].rstrip('/')
+        self.host, self.port = url.hostname, url.port or 80
+
+        # Cada conexão é um descritor de arquivo neste processo também
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < options['connections'] + 100:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, options['connections'] + 100), hard))
+
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        total = options['connections']
+        rss_before = server_rss(options['server_pid']) if options['server_pid'] else None
+        self.delivered = {}
+        self.connect_times = []
+        self.failures = 0
+        self.like_sent = None
+
+        start = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            tasks.append(asyncio.create_task(self.client(i)))
+            if (i + 1) % options['ramp'] == 0:
+                await asyncio.sleep(1)
+        while len(self.connect_times) + self.failures < total:
+            await asyncio.sleep(0.1)
+        self.stdout.write(
+            f"{len(self.connect_times)} conexões abertas em {time.perf_counter() - start:.1f} s, {self.failures} falhas; "
+            f"conexão p50 {percentile(self.connect_times, 0.5):.1f} ms, p95 {percentile(self.connect_times, 0.95):.1f} ms"
+        )
+
+        await asyncio.sleep(options['idle'])
+        alive = sum(not task.done() for task in tasks)
+        rss_after = server_rss(options['server_pid']) if options['server_pid'] else None
+        self.stdout.write(f"{alive} conexões ainda abertas após {options['idle']} s ociosas")
+        if rss_before is not None and rss_after is not None and alive:
+            self.stdout.write(
+                f"memória do servidor: {rss_before:.0f} -> {rss_after:.0f} MB "
+                f"({(rss_after - rss_before) * 1024 / alive:.1f} KB por conexão)"
+            )
+
+        # Curte e descurte: o estado do post volta ao que era e cada conexão recebe dois eventos
+        self.like_sent = time.perf_counter()
+        for _ in range(2):
+            await asyncio.to_thread(self.toggle_like)
+        deadline = time.perf_counter() + 10
+        while len(self.delivered) < alive and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        latencies = list(self.delivered.values())
+        self.stdout.write(
+            f"like entregue a {len(latencies)}/{alive} conexões: p50 {percentile(latencies, 0.5):.1f} ms, "
+            f"p95 {percentile(latencies, 0.95):.1f} ms, máx {max(latencies, default=float('nan')):.1f} ms"
+        )
+        if latencies:
+            self.stdout.write(f"média {statistics.fmean(latencies):.1f} ms")
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def toggle_like(self):
+        request = urllib.request.Request(
+            f'{self.base_url}/api/posts/{self.post.pk}/like/', method='POST',
+            headers={'Authorization': f'Token {self.token}'},
+        )
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    async def client(self, number):
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self.failures += 1
+            return
+        try:
+            writer.write(
+                f'GET /api/events/?topics=post:{self.post.pk} HTTP/1.1\r\nHost: {self.host}\r\n'
+                f'Authorization: Token {self.token}\r\nAccept: text/event-stream\r\n\r\n'.encode()
+            )
+            await writer.drain()
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                self.failures += 1
+                return
+            while (await reader.readline()).strip():
+                pass  # Cabeçalhos
+            self.connect_times.append((time.perf_counter() - started) * 1000)
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return  # Servidor fechou
+                # Com chunked encoding as linhas de tamanho se misturam às do evento; basta achar o nome
+                if line.startswith(b'event: like') and self.like_sent is not None and number not in self.delivered:
+                    self.delivered[number] = (time.perf_counter() - self.like_sent) * 1000
+        except (OSError, asyncio.IncompleteReadError):
+            self.failures += 1
+        finally:
+            writer.close()
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from BlogApp import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Reindexa a busca de todos os posts (título, descrição e comentários), em lotes, cada um na sua transação. "
+        "Rodar uma vez depois da migração 0021, que cria o índice vazio."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=search.INDEX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        total = search.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} post(s) indexado(s) em {time.perf_counter() - start:.1f}s."))
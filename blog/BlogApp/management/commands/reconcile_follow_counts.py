@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from BlogApp.models import Profile, Follow
+
+
+class Command(BaseCommand):
+    help = "Corrige followers_count e following_count dos perfis a partir da tabela Follow, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        real_followers = Coalesce(models.Subquery(self.count_of('following_id')), 0)
+        real_following = Coalesce(models.Subquery(self.count_of('follower_id')), 0)
+
+        last_id = 0
+        fixed = 0
+        while True:
+            ids = list(
+                Profile.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Só reescreve os perfis em que algum contador divergiu
+            fixed += (
+                Profile.objects.filter(id__in=ids)
+                .annotate(real_followers=real_followers, real_following=real_following)
+                .filter(
+                    ~models.Q(followers_count=models.F('real_followers'))
+                    | ~models.Q(following_count=models.F('real_following'))
+                )
+                .update(followers_count=real_followers, following_count=real_following)
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{fixed} perfil(is) corrigido(s)."))
+
+    @staticmethod
+    def count_of(user_field):
+        return (
+            Follow.objects.filter(**{user_field: models.OuterRef('user_id')})
+            .order_by()
+            .values(user_field)
+            .annotate(total=models.Count('*'))
+            .values('total')
+        )
@@ -0,0 +1,84 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from BlogApp import images
+from BlogApp.models import MediaBlob, Post, Profile
+from BlogApp.storage import BLOB_PREFIX
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula MediaBlob.refcount a partir das fotos e miniaturas de posts e perfis e apaga os blobs que "
+        "nenhum deles usa, inclusive arquivos sem registro deixados por transações desfeitas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Só informa o que seria corrigido.")
+        parser.add_argument('--keep-orphans', action='store_true', help="Corrige as contagens sem apagar nada.")
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help="Segundos: blobs mais novos que isso podem ser de um upload ainda em andamento e não são apagados.",
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not getattr(storage, 'content_addressed', False):
+            raise CommandError("O storage padrão não é endereçado por conteúdo (ver MEDIA_STORAGE).")
+        dry_run = options['dry_run']
+        delete = not (dry_run or options['keep_orphans'])
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+
+        references = Counter()
+        targets = (
+            (Post, 'photo_post', 'photo_post_variants'),
+            (Profile, 'photo', 'photo_variants'),
+        )
+        for model, field_name, variants_field in targets:
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for name, variants in rows.values_list(field_name, variants_field).iterator(chunk_size=options['batch_size']):
+                references.update(
+                    item for item in (name, *images.variant_names(variants)) if item.startswith(BLOB_PREFIX)
+                )
+
+        fixed = removed = 0
+        known = set()
+        for blob in MediaBlob.objects.order_by('pk').iterator(chunk_size=options['batch_size']):
+            known.add(blob.name)
+            count = references.get(blob.name, 0)
+            if count == blob.refcount:
+                continue
+            if count:
+                fixed += 1
+                if not dry_run:
+                    MediaBlob.objects.filter(pk=blob.pk).update(refcount=count)
+            elif blob.created_at < cutoff:
+                removed += 1
+                if delete:
+                    blob.delete()
+                    storage.purge(blob.name)
+
+        # Referenciados sem registro: fotos importadas ou gravadas antes da contagem
+        for name in references.keys() - known:
+            if not storage.exists(name):
+                self.stderr.write(f"{name}: referenciado, mas o arquivo não existe.")
+            elif not dry_run:
+                MediaBlob.objects.create(name=name, size=storage.size(name), refcount=references[name])
+                fixed += 1
+            else:
+                fixed += 1
+
+        # Arquivos sem registro nem referência
+        for name in storage.blob_names():
+            if name in known or name in references or storage.get_modified_time(name) >= cutoff:
+                continue
+            removed += 1
+            if delete:
+                storage.purge(name)
+
+        verb = "a apagar" if not delete else "apagado(s)"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} contagem(ns) corrigida(s), {removed} blob(s) órfão(s) {verb}."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from BlogApp.models import Post, Comment
+
+
+class Command(BaseCommand):
+    help = "Recalcula Post.comments_count a partir da tabela de comentários, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        comments = (
+            Comment.objects.filter(post_id=models.OuterRef('pk'))
+            .order_by()
+            .values('post_id')
+            .annotate(total=models.Count('*'))
+            .values('total')
+        )
+        real_count = Coalesce(models.Subquery(comments), 0)
+
+        last_id = 0
+        fixed = 0
+        while True:
+            ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Só reescreve as linhas em que a contagem armazenada divergiu
+            fixed += (
+                Post.objects.filter(id__in=ids)
+                .annotate(real_comments=real_count)
+                .exclude(comments_count=models.F('real_comments'))
+                .update(comments_count=real_count)
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{fixed} post(s) corrigido(s)."))
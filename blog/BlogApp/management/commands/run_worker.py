@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from BlogApp import jobs
+
+
+class Command(BaseCommand):
+    help = "Processa a fila de tarefas em segundo plano, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=1.0, help="Espera (s) quando a fila está vazia.")
+        parser.add_argument('--once', action='store_true', help="Esvazia a fila e sai.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            close_old_connections()
+            claimed = jobs.run_pending(options['batch_size'])
+            total += claimed
+            if claimed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"{total} job(s) processado(s)."))
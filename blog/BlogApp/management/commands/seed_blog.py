@@ -0,0 +1,99 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from BlogApp.models import Post, Comment, Like, Follow, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula o banco com dados sintéticos para benchmarks: usuários, posts, comentários, "
+        "likes e follows, com seguidores distribuídos por lei de potência."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--alpha', type=float, default=1.1, help="Expoente da lei de potência dos seguidores.")
+        parser.add_argument('--password', default='benchmark', help="Senha de todos os usuários criados.")
+        parser.add_argument('--prefix', default='bench', help="Prefixo dos nomes de usuário.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            # Um único hash para todos: make_password por usuário dominaria o tempo de carga
+            password = make_password(options['password'])
+            prefix = options['prefix']
+            users = User.objects.bulk_create(
+                [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password) for i in range(options['users'])],
+                batch_size=batch_size,
+            )
+            user_ids = [user.pk for user in users]
+            Profile.objects.bulk_create([Profile(user_id=user_id) for user_id in user_ids], batch_size=batch_size)
+
+            # Popularidade por lei de potência: o usuário de posição k recebe peso 1 / (k + 1) ** alpha
+            popular = user_ids[:]
+            rng.shuffle(popular)
+            weights = list(accumulate(1 / (rank + 1) ** options['alpha'] for rank in range(len(popular))))
+
+            posts = Post.objects.bulk_create(
+                [
+                    Post(
+                        title=f'Post {i}',
+                        subscription='Lorem ipsum dolor sit amet ' * 3,
+                        author_id=rng.choices(popular, cum_weights=weights)[0],
+                    )
+                    for i in range(options['posts'])
+                ],
+                batch_size=batch_size,
+            )
+            post_ids = [post.pk for post in posts]
+
+            Comment.objects.bulk_create(
+                [
+                    Comment(post_id=rng.choice(post_ids), author_id=rng.choice(user_ids), content=f'Comentário {i}')
+                    for i in range(options['comments'])
+                ],
+                batch_size=batch_size,
+            )
+            Like.objects.bulk_create(
+                [Like(post_id=rng.choice(post_ids), user_id=rng.choice(user_ids)) for _ in range(options['likes'])],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            Follow.objects.bulk_create(
+                [
+                    Follow(follower_id=follower, following_id=following)
+                    for follower, following in (
+                        (rng.choice(user_ids), rng.choices(popular, cum_weights=weights)[0])
+                        for _ in range(options['follows'])
+                    )
+                    if follower != following
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+
+            # bulk_create não passa por save(): os contadores e o índice de busca são recalculados de uma vez no final
+            call_command('recount_likes', batch_size=batch_size, stdout=self.stdout)
+            call_command('recount_comments', batch_size=batch_size, stdout=self.stdout)
+            call_command('reconcile_follow_counts', batch_size=batch_size, stdout=self.stdout)
+            call_command('rebuild_search_index', batch_size=batch_size, stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(user_ids)} usuários e {len(post_ids)} posts gerados em {time.perf_counter() - start:.1f}s."
+        ))
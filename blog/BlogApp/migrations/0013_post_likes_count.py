@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:42
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    Post = apps.get_model('BlogApp', 'Post')
+    Through = Post.likes.through
+    likes = (
+        Through.objects.filter(post_id=models.OuterRef('pk'))
+        .order_by()
+        .values('post_id')
+        .annotate(total=models.Count('*'))
+        .values('total')
+    )
+    Post.objects.update(likes_count=Coalesce(models.Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogApp', '0012_profile_followers_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
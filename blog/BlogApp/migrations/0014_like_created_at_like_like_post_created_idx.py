@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def copy_m2m_likes(apps, schema_editor):
+    """Copia os likes gravados em Post.likes (tabela automática) para Like, em lotes."""
+    Post = apps.get_model('BlogApp', 'Post')
+    Like = apps.get_model('BlogApp', 'Like')
+    Through = Post.likes.through
+
+    last_id = 0
+    while True:
+        rows = list(
+            Through.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'post_id', 'user_id')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        Like.objects.bulk_create(
+            [Like(post_id=post_id, user_id=user_id) for _, post_id, user_id in rows],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogApp', '0013_post_likes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['post', 'created_at'], name='like_post_created_idx'),
+        ),
+        migrations.RunPython(copy_m2m_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def copy_m2m_likes(apps, schema_editor):
+    """Copia os likes gravados em Post.likes depois da 0014 (durante o deploy)."""
+    Post = apps.get_model('BlogApp', 'Post')
+    Like = apps.get_model('BlogApp', 'Like')
+    Through = Post.likes.through
+
+    last_id = 0
+    while True:
+        rows = list(
+            Through.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'post_id', 'user_id')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        Like.objects.bulk_create(
+            [Like(post_id=post_id, user_id=user_id) for _, post_id, user_id in rows],
+            ignore_conflicts=True,
+        )
+
+
+def recount_likes(apps, schema_editor):
+    Post = apps.get_model('BlogApp', 'Post')
+    Like = apps.get_model('BlogApp', 'Like')
+    likes = (
+        Like.objects.filter(post_id=models.OuterRef('pk'))
+        .order_by()
+        .values('post_id')
+        .annotate(total=models.Count('*'))
+        .values('total')
+    )
+    Post.objects.update(likes_count=Coalesce(models.Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogApp', '0014_like_created_at_like_like_post_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_m2m_likes, migrations.RunPython.noop),
+        migrations.RunPython(recount_likes, migrations.RunPython.noop),
+        # Post.likes passa a usar Like como tabela intermediária; a tabela automática é removida
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RemoveField(
+                    model_name='post',
+                    name='likes',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='likes',
+                    field=models.ManyToManyField(blank=True, related_name='liked_posts', through='BlogApp.Like', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+    ]
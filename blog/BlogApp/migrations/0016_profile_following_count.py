@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:20
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_following_count(apps, schema_editor):
+    Profile = apps.get_model('BlogApp', 'Profile')
+    Follow = apps.get_model('BlogApp', 'Follow')
+    following = (
+        Follow.objects.filter(follower_id=models.OuterRef('user_id'))
+        .order_by()
+        .values('follower_id')
+        .annotate(total=models.Count('*'))
+        .values('total')
+    )
+    Profile.objects.update(following_count=Coalesce(models.Subquery(following), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogApp', '0015_alter_post_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_following_count, migrations.RunPython.noop),
+    ]
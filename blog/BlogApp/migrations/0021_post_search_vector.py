@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # Índice GIN (criado com CONCURRENTLY) no PostgreSQL ou tabela FTS5 no SQLite; fora do estado dos modelos por depender do banco.
+    # O índice nasce vazio: os posts existentes são indexados depois, em lotes, com manage.py rebuild_search_index
+    from BlogApp import search
+    search.backend(schema_editor.connection.vendor).setup(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    from BlogApp import search
+    search.backend(schema_editor.connection.vendor).teardown(schema_editor)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY não roda dentro de transação
+
+    dependencies = [
+        ('BlogApp', '0020_post_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
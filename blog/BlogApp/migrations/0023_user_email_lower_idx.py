@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:30
+
+from django.db import migrations
+
+INDEX_NAME = 'auth_user_email_lower_idx'
+
+
+def create_email_index(apps, schema_editor):
+    # auth.User não é deste app: o índice funcional em LOWER(email) é criado direto em SQL
+    table = schema_editor.quote_name(apps.get_model('auth', 'User')._meta.db_table)
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {table} (LOWER(email))')
+
+
+def drop_email_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY não roda dentro de transação
+
+    dependencies = [
+        ('BlogApp', '0022_feed_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:20
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def recount_comments(apps, schema_editor):
+    Post = apps.get_model('BlogApp', 'Post')
+    Comment = apps.get_model('BlogApp', 'Comment')
+    comments = (
+        Comment.objects.filter(post_id=models.OuterRef('pk'))
+        .order_by()
+        .values('post_id')
+        .annotate(total=models.Count('*'))
+        .values('total')
+    )
+    Post.objects.update(comments_count=Coalesce(models.Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogApp', '0023_user_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(recount_comments, migrations.RunPython.noop),
+    ]
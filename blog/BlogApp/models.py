@@ -1,29 +1,88 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from . import images, realtime
+
+
+COMMENTS_PREVIEW_SIZE = 3  # Quantidade de comentários exibidos junto com cada post no feed
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Carrega autor, perfil, contagem de likes e uma prévia dos comentários em um número fixo de queries."""
+        preview = (
+            Comment.objects.select_related('author')
+            .order_by('-created_at', '-id')[:COMMENTS_PREVIEW_SIZE]
+        )
+        return (
+            self.select_related('author', 'author__profile')
+            .prefetch_related(models.Prefetch('comments', queryset=preview, to_attr='prefetched_comments'))
+        )
+
+
 class Post(models.Model):
     title = models.CharField(max_length=25)
     subscription = models.CharField(max_length=100)
     photo_post = models.ImageField(default=None, upload_to='img/')
+    photo_post_variants = models.JSONField(default=dict, blank=True, editable=False)  # Miniaturas geradas a partir de photo_post
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
+    likes = models.ManyToManyField(User, through='Like', related_name='liked_posts', blank=True)
+    likes_count = models.PositiveIntegerField(default=0)  # Contagem desnormalizada de likes
+    comments_count = models.PositiveIntegerField(default=0)  # Contagem desnormalizada de comentários
+    # Título, descrição e comentários para a busca no PostgreSQL (ver BlogApp.search); o índice GIN é criado na migração
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='post_updated_idx'),  # Exportação incremental
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),  # Feed
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),  # Posts de um autor
+        ]
 
     def __str__(self):
         return f"{self.title} / {self.author}"
 
     def toggle_like(self, user):
-        if self.likes.filter(id=user.id).exists():
-            self.likes.remove(user)
-        else:
-            self.likes.add(user)
+        """Curte ou descurte o post, atualizando likes_count na mesma transação. Retorna True se curtiu."""
+        with transaction.atomic():
+            removed, _ = Like.objects.filter(post_id=self.pk, user_id=user.pk).delete()
+            if removed:
+                delta = -1
+            else:
+                try:
+                    with transaction.atomic():
+                        Like.objects.create(post_id=self.pk, user_id=user.pk)
+                    delta = 1
+                except IntegrityError:
+                    # Outro request curtiu o post ao mesmo tempo; o like já existe
+                    delta = 0
+            if delta:
+                Post.objects.filter(pk=self.pk).update(likes_count=models.F('likes_count') + delta)
+        self.refresh_from_db(fields=['likes_count'])
+        if delta:
+            realtime.publish(
+                [realtime.post_topic(self.pk), realtime.user_topic(self.author_id)], 'like',
+                post_id=self.pk, user_id=user.pk, liked=delta > 0, likes_count=self.likes_count,
+            )
+        return delta >= 0
 
-    def likes_count(self):
-        return self.likes.count()
+    def photo_post_srcset(self):
+        """Retorna {formato: srcset} das miniaturas de photo_post."""
+        return images.srcset(self.photo_post.storage, self.photo_post_variants)
+
+    def comments_preview(self):
+        """Retorna os comentários mais recentes do post."""
+        if hasattr(self, 'prefetched_comments'):
+            return self.prefetched_comments
+        return self.comments.select_related('author').order_by('-created_at', '-id')[:COMMENTS_PREVIEW_SIZE]
 
 
 class Follow(models.Model):
@@ -32,37 +91,69 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('follower', 'following')  # Garante que cada relacionamento seja único
+        indexes = [
+            models.Index(fields=['following', 'follower'], name='follow_following_idx'),  # Quem segue X
+        ]
 
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
 
     def save(self, *args, **kwargs):
-        """Ao salvar um novo 'follow', atualiza a contagem de seguidores."""
-        super().save(*args, **kwargs)
-        self.following.profile.update_followers_count()
+        """Ao salvar um novo 'follow', incrementa os contadores na mesma transação."""
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Profile.shift_follow_counts(self.follower_id, self.following_id, 1)
 
     def delete(self, *args, **kwargs):
-        """Ao deletar um 'follow', atualiza a contagem de seguidores."""
-        super().delete(*args, **kwargs)
-        self.following.profile.update_followers_count()
-
-
+        """Ao deletar um 'follow', decrementa os contadores na mesma transação."""
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if result[0]:
+                Profile.shift_follow_counts(self.follower_id, self.following_id, -1)
+        return result
 
+    @classmethod
+    def toggle(cls, follower, following):
+        """Segue ou deixa de seguir. Retorna (seguindo, nova contagem de seguidores)."""
+        follow, created = cls.objects.get_or_create(follower=follower, following=following)
+        if not created:
+            follow.delete()
+        followers_count = Profile.objects.filter(user=following).values_list('followers_count', flat=True).first() or 0
+        realtime.publish(
+            [realtime.user_topic(following.pk), realtime.user_topic(follower.pk)], 'follow',
+            follower_id=follower.pk, user_id=following.pk, following=created, followers_count=followers_count,
+        )
+        return created, followers_count
 
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     photo = models.ImageField(upload_to='profile_photos/', blank=True, null=True)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)  # Miniaturas geradas a partir de photo
     bio = models.TextField(blank=True, null=True)
     followers_count = models.PositiveIntegerField(default=0)  # Novo campo para contagem de seguidores
+    following_count = models.PositiveIntegerField(default=0)  # Quantos usuários este perfil segue
 
     def __str__(self):
         return f"Profile of {self.user.username}"
 
-    def update_followers_count(self):
-        """Atualiza o campo followers_count com a contagem atual de seguidores."""
-        self.followers_count = Follow.objects.filter(following=self.user).count()
-        self.save()
+    def photo_srcset(self):
+        """Retorna {formato: srcset} das miniaturas da foto de perfil."""
+        return images.srcset(self.photo.storage, self.photo_variants)
+
+    @staticmethod
+    def shift_follow_counts(follower_id, following_id, delta):
+        """Soma delta aos contadores com F(), sem recontar a tabela Follow nem salvar o perfil inteiro."""
+        followers = Profile.objects.filter(user_id=following_id)
+        following = Profile.objects.filter(user_id=follower_id)
+        if delta < 0:
+            # Evita estourar o PositiveIntegerField se o contador já estiver defasado
+            followers = followers.filter(followers_count__gte=-delta)
+            following = following.filter(following_count__gte=-delta)
+        followers.update(followers_count=models.F('followers_count') + delta)
+        following.update(following_count=models.F('following_count') + delta)
 
 
     
@@ -72,6 +163,11 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_idx'),  # Comentários de um post
+        ]
+
     def __str__(self):
         return f"{self.author.username}: {self.content[:20]}"
 
@@ -81,14 +177,112 @@ class Comment(models.Model):
         if len(self.content) > 500:
             raise ValidationError("O comentário não pode ter mais de 500 caracteres.")
 
+    def save(self, *args, **kwargs):
+        """Ao salvar um novo comentário, incrementa Post.comments_count na mesma transação."""
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Post.objects.filter(pk=self.post_id).update(comments_count=models.F('comments_count') + 1)
+
+    def delete(self, *args, **kwargs):
+        """Ao deletar um comentário, decrementa Post.comments_count na mesma transação."""
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if result[0]:
+                # Evita estourar o PositiveIntegerField se o contador já estiver defasado
+                Post.objects.filter(pk=self.post_id, comments_count__gt=0).update(
+                    comments_count=models.F('comments_count') - 1,
+                )
+        return result
+
     
 
 class Like(models.Model):
+    """Tabela única de likes; também é a tabela intermediária de Post.likes."""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('user', 'post')  # Impede múltiplos likes do mesmo usuário no mesmo post
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='like_post_created_idx'),
+        ]
+
+    @classmethod
+    def liked_post_ids(cls, user, post_ids):
+        """Retorna, em uma única query, quais dos posts informados o usuário curtiu."""
+        if not user.is_authenticated or not post_ids:
+            return set()
+        return set(cls.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True))
 
     def __str__(self):
         return f"{self.user.username} liked {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """Caixa de entrada materializada da timeline 'seguindo' de cada usuário (fan-out na escrita)."""
+    user = models.ForeignKey(User, related_name='timeline_entries', on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='timeline_entries', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()  # Cópia de post.created_at, para ordenar sem join
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in {self.user_id}'s timeline"
+
+
+class Job(models.Model):
+    """Tarefa da fila de segundo plano (ver BlogApp.jobs)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendente'),
+        (RUNNING, 'Executando'),
+        (DONE, 'Concluída'),
+        (FAILED, 'Falhou'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # Único só entre os jobs por fazer: depois de concluído ou falho, o mesmo trabalho pode ser enfileirado de novo
+    idempotency_key = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)  # Próxima execução, ou fim da reserva do worker
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'], condition=models.Q(status__in=['pending', 'running']),
+                name='job_active_idempotency_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """Arquivo de mídia endereçado por conteúdo (ver BlogApp.storage) e quantas fotos e miniaturas o usam."""
+    name = models.CharField(max_length=255, unique=True)  # blobs/ab/cd/<sha256>.<extensão>
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import re
+import threading
+import uuid
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+TOPIC = re.compile(r'^(post|user):\d+$')
+
+
+def post_topic(post_id):
+    return f'post:{post_id}'
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+def frame(event, data):
+    """Evento no formato text/event-stream, montado uma vez por publicação e não por inscrito.
+
+    O id é o mesmo em todos os tópicos da publicação: quem ouve o post e o autor descarta a repetição.
+    """
+    return f'id: {uuid.uuid4().hex}\nevent: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+class Subscription:
+    """Fila de eventos de uma conexão, inscrita em alguns tópicos, no event loop que a criou."""
+
+    def __init__(self, topics, maxsize):
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Cliente que não lê a tempo perde eventos em vez de acumular memória
+            self.dropped += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InMemoryBroker:
+    """Entrega os eventos às conexões do próprio processo (testes e servidor único).
+
+    publish() pode ser chamado de qualquer thread (as views síncronas rodam fora do event loop):
+    a entrega é agendada com call_soon_threadsafe, uma vez por loop e não por inscrito.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.topics = defaultdict(set)  # tópico -> {Subscription}
+
+    async def subscribe(self, topics):
+        subscription = Subscription(topics, settings.REALTIME_QUEUE_SIZE)
+        with self.lock:
+            for topic in subscription.topics:
+                self.topics[topic].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        with self.lock:
+            for topic in subscription.topics:
+                subscribers = self.topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.topics[topic]
+
+    def publish(self, topic, message):
+        self.deliver(topic, message)
+
+    def deliver(self, topic, message):
+        with self.lock:
+            subscribers = list(self.topics.get(topic, ()))
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, subscriptions in by_loop.items():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._put_all, subscriptions, message)
+
+    @staticmethod
+    def _put_all(subscriptions, message):
+        for subscription in subscriptions:
+            subscription.put(message)
+
+
+class RedisBroker(InMemoryBroker):
+    """Vários processos ou servidores: PUBLISH no Redis e, em cada processo, uma única conexão
+    inscrita nos tópicos que suas conexões ouvem, repassando as mensagens aos inscritos locais.
+    """
+
+    CHANNEL_PREFIX = 'blog:realtime:'
+
+    def __init__(self, url=None):
+        super().__init__()
+        # Importado aqui: o cliente do Redis só é necessário com este broker
+        import redis
+
+        self.url = url or settings.REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+        self.pubsub = None
+        self.listener = None
+
+    async def subscribe(self, topics):
+        import redis.asyncio
+
+        with self.lock:
+            new_topics = [topic for topic in topics if topic not in self.topics]
+        subscription = await super().subscribe(topics)
+        if self.pubsub is None:
+            self.pubsub = redis.asyncio.Redis.from_url(self.url).pubsub()
+        if new_topics:
+            await self.pubsub.subscribe(*(self.CHANNEL_PREFIX + topic for topic in new_topics))
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        await super().unsubscribe(subscription)
+        with self.lock:
+            unused = [topic for topic in subscription.topics if topic not in self.topics]
+        if unused and self.pubsub is not None:
+            await self.pubsub.unsubscribe(*(self.CHANNEL_PREFIX + topic for topic in unused))
+
+    def publish(self, topic, message):
+        self.client.publish(self.CHANNEL_PREFIX + topic, message)
+
+    async def listen(self):
+        async for message in self.pubsub.listen():
+            if message['type'] == 'message':
+                topic = message['channel'].decode()[len(self.CHANNEL_PREFIX):]
+                self.deliver(topic, message['data'].decode())
+
+
+_broker = None
+
+
+def broker():
+    """Broker do processo, da classe em REALTIME_BROKER."""
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def _send(topics, message):
+    current = broker()
+    for topic in topics:
+        current.publish(topic, message)
+
+
+def publish(topics, event, **data):
+    """Publica o evento nos tópicos depois do commit da transação atual.
+
+    Uma falha do broker é registrada no log e não desfaz nem quebra a escrita que a originou.
+    """
+    transaction.on_commit(partial(_send, list(topics), frame(event, data)), robust=True)
@@ -0,0 +1,176 @@
+import contextlib
+import contextvars
+import hashlib
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_KEY = 'db:sticky:{}'
+
+# Lidos sempre do primário: a sessão e o token recém-criados no login são usados já no request seguinte
+PRIMARY_MODELS = {'sessions.session', 'authtoken.token'}
+
+_routing = contextvars.ContextVar('db_routing', default=None)
+_unavailable = {}  # réplica -> time.monotonic() até quando não é usada
+
+
+class Routing:
+    """Para onde vão as leituras do request atual."""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica  # Alias da réplica, ou None para ler do primário
+        self.wrote = False
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def healthy(alias):
+    """Confere a conexão com a réplica (a checagem de CONN_HEALTH_CHECKS mais a conexão em si).
+
+    Uma réplica fora do ar fica de lado por DB_REPLICA_RETRY_AFTER segundos, e as leituras vão para o primário.
+    """
+    if _unavailable.get(alias, 0) > time.monotonic():
+        return False
+    connection = connections[alias]
+    try:
+        connection.close_if_health_check_failed()
+        connection.ensure_connection()
+    except DatabaseError:
+        logger.warning("Réplica %s indisponível; lendo do primário por %s s", alias, settings.DB_REPLICA_RETRY_AFTER)
+        _unavailable[alias] = time.monotonic() + settings.DB_REPLICA_RETRY_AFTER
+        return False
+    return True
+
+
+def pick_replica():
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None  # Request inteiro numa transação do primário (ATOMIC_REQUESTS, testes)
+    candidates = replicas()
+    random.shuffle(candidates)
+    return next((alias for alias in candidates if healthy(alias)), None)
+
+
+@contextlib.contextmanager
+def primary():
+    """Leituras do bloco no primário, mesmo num request roteado para a réplica.
+
+    Para o que vai para um cache compartilhado (páginas do feed, o usuário logado): lido da
+    réplica logo depois de uma escrita, um valor atrasado ficaria guardado sob a versão nova da
+    chave até expirar, para todos os clientes.
+    """
+    routing = _routing.get()
+    replica = routing.replica if routing is not None else None
+    if replica is not None:
+        routing.replica = None
+    try:
+        yield
+    finally:
+        if replica is not None and not routing.wrote:
+            routing.replica = replica
+
+
+class ReplicaRouter:
+    """Leituras na réplica escolhida para o request; escritas, e tudo depois delas, no primário.
+
+    Também ficam no primário as leituras dentro de uma transação aberta nele, que precisam ver
+    as próprias escritas, e as dos modelos em PRIMARY_MODELS.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None or model._meta.label_lower in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None and model._meta.label_lower not in PRIMARY_MODELS:
+            # Ler o que acabou de escrever: o resto do request, e os próximos do usuário, vão para o primário
+            routing.replica = None
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # As réplicas têm os mesmos dados do primário
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def sticky_key(credential):
+    return STICKY_KEY.format(hashlib.sha256(credential.encode()).hexdigest())
+
+
+def credentials(request, response=None):
+    """Identificam o cliente sem consultar o banco: o header Authorization ou o cookie de sessão."""
+    values = [request.headers.get('Authorization'), request.COOKIES.get(settings.SESSION_COOKIE_NAME)]
+    if response is not None and settings.SESSION_COOKIE_NAME in response.cookies:
+        values.append(response.cookies[settings.SESSION_COOKIE_NAME].value)  # Sessão criada no login
+    return [value for value in values if value]
+
+
+class ReplicaRoutingMiddleware:
+    """Manda as leituras de GET e HEAD para uma réplica, com read-your-writes.
+
+    Um request que escreve (like, comentário, follow…) marca o cliente no cache, e os GETs dele
+    leem do primário por DB_REPLICA_STICKY_SECONDS, o bastante para a réplica alcançar a escrita.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        replica = None
+        if self.read_only(request) and not cache.get_many(self.sticky_keys(request)):
+            replica = pick_replica()
+        token = _routing.set(Routing(replica))
+        try:
+            response = self.get_response(request)
+            routing = _routing.get()
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            cache.set_many(dict.fromkeys(self.sticky_keys(request, response), 1), settings.DB_REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        replica = None
+        if self.read_only(request) and not await cache.aget_many(self.sticky_keys(request)):
+            # A conexão com a réplica é conferida na thread em que o ORM do request vai rodar
+            replica = await sync_to_async(pick_replica)()
+        token = _routing.set(Routing(replica))
+        try:
+            response = await self.get_response(request)
+            routing = _routing.get()
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            await cache.aset_many(dict.fromkeys(self.sticky_keys(request, response), 1), settings.DB_REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def read_only(request):
+        return request.method in ('GET', 'HEAD') and bool(replicas())
+
+    @staticmethod
+    def sticky_keys(request, response=None):
+        return [sticky_key(credential) for credential in credentials(request, response)]
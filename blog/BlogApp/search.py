@@ -0,0 +1,166 @@
+import base64
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import Post, Comment
+
+INDEX_BATCH_SIZE = 1000
+FTS_TABLE = 'blog_post_fts'  # Espelho FTS5 de Post usado no SQLite
+GIN_INDEX = 'post_search_idx'
+_WORD = re.compile(r'\w+')
+
+
+def encode_cursor(rank, post_id):
+    return base64.urlsafe_b64encode(f'{rank!r}|{post_id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Converte o cursor em (rank, post_id). Levanta ValueError se for inválido."""
+    rank, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return float(rank), int(post_id)
+
+
+class PostgresSearch:
+    """Post.search_vector (título A, descrição B, comentários C) com índice GIN."""
+
+    def document(self, comment_model=Comment):
+        # Importado aqui: o módulo de agregados exige o driver do PostgreSQL
+        from django.contrib.postgres.aggregates import StringAgg
+
+        config = settings.SEARCH_CONFIG
+        comments = (
+            comment_model.objects.filter(post_id=OuterRef('pk'))
+            .order_by()
+            .values('post_id')
+            .annotate(text=StringAgg('content', delimiter=' '))
+            .values('text')
+        )
+        return (
+            SearchVector('title', weight='A', config=config)
+            + SearchVector('subscription', weight='B', config=config)
+            + SearchVector(Subquery(comments), weight='C', config=config)
+        )
+
+    def setup(self, schema_editor):
+        # CONCURRENTLY, como AddIndexConcurrently (migração 0022): as escritas em posts seguem durante a criação
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {GIN_INDEX} ON {Post._meta.db_table} USING gin (search_vector)'
+        )
+
+    def teardown(self, schema_editor):
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {GIN_INDEX}')
+
+    def index(self, post_ids, post_model=Post, comment_model=Comment):
+        post_model.objects.filter(pk__in=post_ids).update(search_vector=self.document(comment_model))
+
+    def remove(self, post_ids):
+        pass  # O vetor é apagado junto com a linha do post
+
+    def search(self, text, cursor, limit):
+        query = SearchQuery(text, search_type='websearch', config=settings.SEARCH_CONFIG)
+        matches = Post.objects.annotate(rank=SearchRank(F('search_vector'), query)).filter(search_vector=query)
+        if cursor is not None:
+            rank, post_id = cursor
+            matches = matches.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=post_id))
+        return list(matches.order_by('-rank', '-id').values_list('rank', 'id')[:limit])
+
+
+class SQLiteSearch:
+    """Fallback portátil: tabela FTS5 com rowid = id do post, ordenada por bm25."""
+
+    WEIGHTS = (10.0, 4.0, 1.0)  # título, descrição, comentários
+
+    def setup(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"title, subscription, comments, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def teardown(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+    def index(self, post_ids, post_model=Post, comment_model=Comment):
+        post_ids = list(post_ids)
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, subscription, comments) '
+                f'SELECT p.id, p.title, p.subscription, '
+                f'COALESCE((SELECT group_concat(c.content, \' \') FROM "{comment_model._meta.db_table}" c WHERE c.post_id = p.id), \'\') '
+                f'FROM "{post_model._meta.db_table}" p WHERE p.id IN ({placeholders})',
+                post_ids,
+            )
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(post_ids))})", post_ids)
+
+    def search(self, text, cursor, limit):
+        # Cada palavra vira um termo entre aspas: nada do texto é lido como sintaxe do FTS5
+        match = ' '.join(f'"{word}"' for word in _WORD.findall(text))
+        if not match:
+            return []
+        weights = ', '.join(map(str, self.WEIGHTS))
+        sql = (
+            f'SELECT score, id FROM (SELECT rowid AS id, -bm25({FTS_TABLE}, {weights}) AS score '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [match]
+        if cursor is not None:
+            rank, post_id = cursor
+            sql += ' WHERE score < %s OR (score = %s AND id < %s)'
+            params += [rank, rank, post_id]
+        sql += ' ORDER BY score DESC, id DESC LIMIT %s'
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params + [limit])
+            return db_cursor.fetchall()
+
+
+BACKENDS = {'postgresql': PostgresSearch, 'sqlite': SQLiteSearch}
+
+
+def backend(vendor=None):
+    return BACKENDS[vendor or connection.vendor]()
+
+
+def index_posts(post_ids):
+    """Atualiza o índice de busca só dos posts informados (os que sumiram saem do índice)."""
+    post_ids = list(post_ids)
+    if post_ids:
+        backend().index(post_ids)
+
+
+def remove_posts(post_ids):
+    post_ids = list(post_ids)
+    if post_ids:
+        backend().remove(post_ids)
+
+
+def rebuild(batch_size=INDEX_BATCH_SIZE, post_model=Post, comment_model=Comment):
+    """Reindexa todos os posts em lotes de ids. Retorna quantos foram indexados."""
+    search = backend()
+    total = 0
+    last_id = 0
+    while True:
+        post_ids = list(
+            post_model.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not post_ids:
+            return total
+        search.index(post_ids, post_model, comment_model)
+        total += len(post_ids)
+        last_id = post_ids[-1]
+
+
+def search_posts(text, cursor=None, limit=20):
+    """Retorna (posts, next_cursor) com os posts mais relevantes para o texto, por keyset (rank, id)."""
+    rows = backend().search(text, cursor, limit)
+    posts = Post.objects.for_feed().in_bulk([post_id for _, post_id in rows])
+    next_cursor = encode_cursor(*rows[-1]) if len(rows) == limit else None
+    return [posts[post_id] for _, post_id in rows if post_id in posts], next_cursor
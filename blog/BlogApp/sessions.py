@@ -0,0 +1,24 @@
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    """Sessão lida do cache (do banco só na falta dele) e gravada no banco e no cache (write-through).
+
+    Só é gravada quando o conteúdo mudou de fato: atribuir a uma chave o valor que ela já tinha
+    marca a sessão como alterada, mas não gera escrita no banco nem no cache.
+    """
+
+    def snapshot(self, data):
+        # O mesmo formato gravado, sem a assinatura (que muda a cada segundo)
+        return self.serializer().dumps(data)
+
+    def load(self):
+        data = super().load()
+        self._saved = self.snapshot(data)
+        return data
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key and getattr(self, '_saved', None) == self.snapshot(self._session):
+            return
+        super().save(must_create)
+        self._saved = self.snapshot(self._session)
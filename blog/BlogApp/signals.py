@@ -0,0 +1,156 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import auth, cache, images, jobs, realtime, search, storage
+from .models import Post, Comment, Like, Follow, Profile
+
+
+# As versões só são incrementadas após o commit, para que nenhum request
+# recoloque no cache dados anteriores à escrita.
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    transaction.on_commit(partial(cache.invalidate_post, instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Like)
+def invalidate_parent_post_cache(sender, instance, **kwargs):
+    transaction.on_commit(partial(cache.invalidate_post, instance.post_id))
+
+
+@receiver([post_save, post_delete], sender=Follow)
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_feed_cache(sender, instance, **kwargs):
+    transaction.on_commit(cache.invalidate_feed)
+
+
+# O usuário em cache das sessões (ver BlogApp.auth.get_user) sai ao ser alterado: senha, is_active, last_login…
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    transaction.on_commit(partial(auth.invalidate_user, instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        jobs.enqueue(
+            'timeline.backfill_author', key=f'timeline.backfill:{instance.pk}',
+            user_id=instance.follower_id, author_id=instance.following_id,
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    jobs.enqueue(
+        'timeline.remove_author', key=f'timeline.prune:{instance.pk}',
+        user_id=instance.follower_id, author_id=instance.following_id,
+    )
+
+
+def enqueue_variants(instance, field_name, variants_field):
+    field_file = getattr(instance, field_name)
+    if images.needs_variants(field_file, getattr(instance, variants_field)):
+        jobs.enqueue(
+            'images.build_variants', key=f'variants:{instance._meta.label}:{instance.pk}:{field_file.name}',
+            model_label=instance._meta.label, pk=instance.pk, field_name=field_name, variants_field=variants_field,
+        )
+
+
+@receiver(post_save, sender=Post)
+def schedule_post_photo_variants(sender, instance, **kwargs):
+    enqueue_variants(instance, 'photo_post', 'photo_post_variants')
+
+
+@receiver(post_save, sender=Profile)
+def schedule_profile_photo_variants(sender, instance, **kwargs):
+    enqueue_variants(instance, 'photo', 'photo_variants')
+
+
+# Mídia: a foto substituída e as fotos de um post ou perfil apagado soltam suas referências após o commit;
+# com o storage endereçado por conteúdo, o arquivo só sai quando nenhum outro post ou perfil o usa
+def release_replaced_photo(instance, update_fields, field_name, variants_field):
+    if instance._state.adding or (update_fields is not None and field_name not in update_fields):
+        return
+    old = type(instance).objects.filter(pk=instance.pk).values(field_name, variants_field).first()
+    if old is None or not old[field_name] or old[field_name] == getattr(instance, field_name).name:
+        return
+    names = [old[field_name]]
+    if update_fields is None or variants_field in update_fields:
+        # Sem isto, build_variants soltaria as miniaturas antigas de novo ao gerar as da foto nova
+        names += images.variant_names(old[variants_field])
+        setattr(instance, variants_field, {})
+    transaction.on_commit(partial(storage.release_files, getattr(instance, field_name).storage, names))
+
+
+def release_photos(instance, field_name, variants_field):
+    field_file = getattr(instance, field_name)
+    names = [field_file.name, *images.variant_names(getattr(instance, variants_field))]
+    transaction.on_commit(partial(storage.release_files, field_file.storage, names))
+
+
+@receiver(pre_save, sender=Post)
+def release_replaced_post_photo(sender, instance, update_fields=None, **kwargs):
+    release_replaced_photo(instance, update_fields, 'photo_post', 'photo_post_variants')
+
+
+@receiver(pre_save, sender=Profile)
+def release_replaced_profile_photo(sender, instance, update_fields=None, **kwargs):
+    release_replaced_photo(instance, update_fields, 'photo', 'photo_variants')
+
+
+@receiver(post_delete, sender=Post)
+def release_post_photos(sender, instance, **kwargs):
+    release_photos(instance, 'photo_post', 'photo_post_variants')
+
+
+@receiver(post_delete, sender=Profile)
+def release_profile_photos(sender, instance, **kwargs):
+    release_photos(instance, 'photo', 'photo_variants')
+
+
+# Busca: só o post alterado é reindexado, fora do request; as escritas de um post ainda na fila
+# viram um job só (a reindexação lê o post quando roda)
+def index_later(post_id):
+    jobs.enqueue('search.index_posts', key=f'search.index:{post_id}', post_ids=[post_id])
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    index_later(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def index_commented_post(sender, instance, origin=None, **kwargs):
+    # Comentários apagados em cascata com o post: o post sai do índice em unindex_post
+    if isinstance(origin, Post) or getattr(origin, 'model', None) is Post:
+        return
+    index_later(instance.post_id)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+# Tempo real: o post e o seu autor recebem os comentários novos; as remoções (também em cascata,
+# ao apagar o post) vão só para o tópico do post, sem carregar o post de cada comentário
+@receiver(post_save, sender=Comment)
+def publish_comment(sender, instance, created, **kwargs):
+    if created:
+        realtime.publish(
+            [realtime.post_topic(instance.post_id), realtime.user_topic(instance.post.author_id)], 'comment',
+            post_id=instance.post_id, id=instance.pk, author=instance.author.username,
+            content=instance.content, created_at=instance.created_at,
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def publish_comment_deleted(sender, instance, **kwargs):
+    realtime.publish(
+        [realtime.post_topic(instance.post_id)], 'comment_deleted',
+        post_id=instance.post_id, id=instance.pk,
+    )
@@ -0,0 +1,254 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+import uuid
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, Storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import F
+from django.utils.encoding import filepath_to_uri
+
+from .models import MediaBlob
+
+CHUNK_SIZE = 64 * 1024
+BLOB_PREFIX = 'blobs/'
+
+
+def blob_name(digest, ext):
+    """sha256 + extensão -> blobs/ab/cd/abcd….png; dois níveis de diretório para não acumular milhões de arquivos em um só."""
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}'
+
+
+def retain(name, size):
+    """Mais uma referência ao blob; cria o registro no primeiro uso. Retorna True se o blob é novo."""
+    # select_for_update serializa com release(): o arquivo não é apagado entre esta contagem e a gravação
+    blob, created = MediaBlob.objects.select_for_update().get_or_create(name=name, defaults={'size': size})
+    if not created:
+        MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+    return created
+
+
+def release(name):
+    """Uma referência a menos ao blob. Retorna True se era a última e o arquivo pode ser apagado."""
+    blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+    if blob is None:
+        return True  # Arquivo sem registro, gravado antes deste storage
+    if blob.refcount > 1:
+        MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+        return False
+    blob.delete()
+    return True
+
+
+def release_files(storage, names):
+    """Solta as referências de um post ou perfil apagado, ou de uma foto substituída."""
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Grava o upload em disco em blocos de 64 KB, à medida que chega, calculando o sha256 no caminho.
+
+    Nenhum upload fica inteiro em memória, e o storage endereçado por conteúdo usa o hash
+    (content_hash) sem reler o arquivo.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.digest.hexdigest()
+        return file
+
+
+class ContentAddressedMixin:
+    """Grava cada arquivo uma única vez, em blobs/ com o sha256 do conteúdo como nome.
+
+    O nome pedido (img/foto.png) só fornece a extensão: a mesma imagem enviada de novo, em outro
+    post ou perfil, aponta para o mesmo blob. Cada save() é uma referência e cada delete() solta
+    uma (ver MediaBlob); o arquivo só é apagado quando a última referência sai. Como o conteúdo
+    de um nome nunca muda, as URLs podem ser cacheadas como imutáveis (MEDIA_CACHE_MAX_AGE).
+
+    As subclasses implementam _store(), que grava o blob a partir de um arquivo local já completo,
+    e blob_names(), que lista os blobs gravados.
+    """
+    content_addressed = True
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final sai do conteúdo em _save(); um nome existente é o mesmo arquivo, não um conflito
+        return name
+
+    def temp_dir(self):
+        return settings.FILE_UPLOAD_TEMP_DIR
+
+    def spool(self, content):
+        """Copia content em blocos para um arquivo temporário calculando o sha256. Retorna (hash, tamanho, caminho)."""
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.temp_dir(), delete=False) as temp:
+            for chunk in content.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                temp.write(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size, temp.name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1]
+        digest = getattr(content, 'content_hash', None)
+        if digest is not None and hasattr(content, 'temporary_file_path'):
+            # Upload de HashingUploadHandler: já está em disco, com o hash calculado
+            spooled = False
+            size, source = content.size, content.temporary_file_path()
+        else:
+            spooled = True
+            digest, size, source = self.spool(content)
+        name = blob_name(digest, ext)
+        try:
+            with transaction.atomic():
+                retain(name, size)
+                if not self.exists(name):
+                    self._store(name, source)
+        finally:
+            if spooled and os.path.exists(source):
+                os.remove(source)
+        return name
+
+    def delete(self, name):
+        with transaction.atomic():
+            if release(name):
+                super().delete(name)
+
+    def purge(self, name):
+        """Apaga o arquivo sem consultar as referências (ver o comando reconcile_media)."""
+        super().delete(name)
+
+    def _store(self, name, source):
+        """Move ou envia o arquivo local completo source para o blob name."""
+        raise NotImplementedError
+
+    def blob_names(self):
+        """Nomes de todos os blobs gravados (ver o comando reconcile_media)."""
+        raise NotImplementedError
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    """Blobs em MEDIA_ROOT, para um único servidor (ou um MEDIA_ROOT compartilhado entre eles)."""
+
+    def temp_dir(self):
+        # No mesmo sistema de arquivos dos blobs: mover o temporário para o lugar é um rename
+        path = self.path('tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _store(self, name, source):
+        path = self.path(name)
+        directory, filename = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        # Gravado com nome oculto e renomeado: quem lê o blob nunca vê um arquivo pela metade
+        partial = os.path.join(directory, f'.{filename}.{uuid.uuid4().hex}.part')
+        file_move_safe(source, partial)
+        if self.file_permissions_mode is not None:
+            os.chmod(partial, self.file_permissions_mode)
+        os.replace(partial, path)
+
+    def blob_names(self):
+        root = self.path(BLOB_PREFIX)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.startswith('.'):
+                    yield os.path.relpath(os.path.join(directory, filename), self.location).replace(os.sep, '/')
+
+
+class S3Storage(Storage):
+    """Objetos em um bucket S3 ou compatível (MinIO, para vários servidores); configurado por MEDIA_S3_*."""
+
+    def __init__(self):
+        # Importado aqui: o boto3 só é necessário com este storage
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.ClientError = ClientError
+        self.bucket = settings.MEDIA_S3_BUCKET
+        self.client = boto3.client(
+            's3',
+            endpoint_url=settings.MEDIA_S3_ENDPOINT_URL or None,
+            aws_access_key_id=settings.MEDIA_S3_ACCESS_KEY or None,
+            aws_secret_access_key=settings.MEDIA_S3_SECRET_KEY or None,
+            region_name=settings.MEDIA_S3_REGION or None,
+        )
+        self.base_url = settings.MEDIA_S3_PUBLIC_URL or f'{settings.MEDIA_S3_ENDPOINT_URL.rstrip("/")}/{self.bucket}/'
+
+    def extra_args(self, name):
+        return {
+            'ContentType': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            'CacheControl': f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+        }
+
+    def _open(self, name, mode='rb'):
+        body = self.client.get_object(Bucket=self.bucket, Key=name)['Body']
+        # Em memória até 5 MB, depois em disco
+        file = tempfile.SpooledTemporaryFile(max_size=5 * 1024 * 1024)
+        for chunk in body.iter_chunks(CHUNK_SIZE):
+            file.write(chunk)
+        file.seek(0)
+        return File(file, name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        # upload_fileobj envia em partes (multipart) sem ler o arquivo inteiro
+        self.client.upload_fileobj(content, self.bucket, name, ExtraArgs=self.extra_args(name))
+        return name
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=name)
+        except self.ClientError as exc:
+            if exc.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        return self._head(name)['ContentLength']
+
+    def get_modified_time(self, name):
+        return self._head(name)['LastModified']
+
+    def url(self, name):
+        return urljoin(self.base_url, filepath_to_uri(name))
+
+
+class ContentAddressedS3Storage(ContentAddressedMixin, S3Storage):
+    """Blobs no bucket: o mesmo armazenamento para todos os servidores da aplicação."""
+
+    def extra_args(self, name):
+        args = super().extra_args(name)
+        args['CacheControl'] += ', immutable'
+        return args
+
+    def _store(self, name, source):
+        self.client.upload_file(source, self.bucket, name, ExtraArgs=self.extra_args(name))
+
+    def blob_names(self):
+        pages = self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=BLOB_PREFIX)
+        for page in pages:
+            for item in page.get('Contents', ()):
+                yield item['Key']
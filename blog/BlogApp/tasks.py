@@ -0,0 +1,20 @@
+from . import images, search, timeline
+from .jobs import task
+from .models import Post
+
+# Tarefas executadas fora do request pela fila (manage.py run_worker)
+task('images.build_variants')(images.build_variants)
+task('timeline.backfill_author')(timeline.backfill_author)
+task('timeline.remove_author')(timeline.remove_author)
+
+
+@task('timeline.fan_out')
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task('search.index_posts')
+def index_posts(post_ids):
+    search.index_posts(post_ids)
@@ -1,3 +1,831 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from api.authentication import issue_token
+
+from . import auth, images, jobs, routers, search, timeline
+from .management.commands.import_blog_data import copy_buffer
+from .instrumentation import QueryBudgetExceeded, fingerprint, metrics
+from .models import Post, Like, Follow, Profile, TimelineEntry, Comment, Job, MediaBlob
+from .sessions import SessionStore
+
+
+class PostLikeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor', password='senha123')
+        self.author = User.objects.create_user(username='autor')
+        self.post = Post.objects.create(title='Post', subscription='...', author=self.author)
+
+    def test_toggle_like_keeps_counter_in_sync(self):
+        self.assertTrue(self.post.toggle_like(self.user))
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertTrue(Like.objects.filter(user=self.user, post=self.post).exists())
+
+        self.assertFalse(self.post.toggle_like(self.user))
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_like_view_uses_counter(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('like_post', args=[self.post.id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_liked_post_ids_is_bounded_to_given_posts(self):
+        other = Post.objects.create(title='Outro', subscription='...', author=self.author)
+        self.post.toggle_like(self.user)
+        other.toggle_like(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(Like.liked_post_ids(self.user, [self.post.id]), {self.post.id})
+
+    def test_recount_likes_repairs_drift(self):
+        self.post.likes.add(self.user, self.author)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7)
+
+        call_command('recount_likes', batch_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+
+
+class FollowCountTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        Profile.objects.create(user=self.alice)
+        Profile.objects.create(user=self.bob)
+
+    def counts(self, user):
+        profile = Profile.objects.get(user=user)
+        return profile.followers_count, profile.following_count
+
+    def test_toggle_shifts_both_counters(self):
+        self.assertEqual(Follow.toggle(self.alice, self.bob), (True, 1))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+        self.assertEqual(self.counts(self.alice), (0, 1))
+
+        self.assertEqual(Follow.toggle(self.alice, self.bob), (False, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertEqual(self.counts(self.alice), (0, 0))
+
+    def test_reconcile_follow_counts_repairs_drift(self):
+        Follow.objects.create(follower=self.alice, following=self.bob)
+        Profile.objects.update(followers_count=5, following_count=5)
+
+        call_command('reconcile_follow_counts', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(self.counts(self.bob), (1, 0))
+        self.assertEqual(self.counts(self.alice), (0, 1))
+
+
+class CommentCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        self.post = Post.objects.create(title='Post', subscription='...', author=self.user)
+
+    def comments_count(self):
+        return Post.objects.values_list('comments_count', flat=True).get(pk=self.post.pk)
+
+    def test_create_and_delete_shift_counter(self):
+        comments = [Comment.objects.create(post=self.post, author=self.user, content=f'C{i}') for i in range(3)]
+        self.assertEqual(self.comments_count(), 3)
+        comments[0].delete()
+        self.assertEqual(self.comments_count(), 2)
+
+    def test_recount_comments_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.user, content='Oi')
+        Post.objects.update(comments_count=7)
+        call_command('recount_comments', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.comments_count(), 1)
+
+    def test_post_view_paginates_comments(self):
+        for i in range(25):
+            Comment.objects.create(post=self.post, author=self.user, content=f'Comentário {i}')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('post_detail', args=[self.post.pk]))
+        self.assertEqual(len(response.context['comments']), 20)
+        self.assertContains(response, 'Comentários (25)')
+        self.assertEqual(response.context['comments'][0].content, 'Comentário 24')
+
+        response = self.client.get(reverse('post_detail', args=[self.post.pk]), {'antes': response.context['next_cursor']})
+        self.assertEqual([c.content for c in response.context['comments']], [f'Comentário {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertEqual(self.client.get(reverse('post_detail', args=[self.post.pk]), {'antes': 'x'}).status_code, 404)
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='leitor')
+        self.author = User.objects.create_user(username='autor')
+        self.stranger = User.objects.create_user(username='estranho')
+        for user in (self.reader, self.author, self.stranger):
+            Profile.objects.create(user=user)
+        Follow.toggle(self.reader, self.author)
+
+    def publish(self, author, title):
+        post = Post.objects.create(title=title, subscription='...', author=author)
+        timeline.fan_out(post)
+        return post
+
+    def test_fan_out_delivers_only_followed_authors(self):
+        post = self.publish(self.author, 'Seguido')
+        self.publish(self.stranger, 'Estranho')
+        posts, next_cursor = timeline.read_timeline(self.reader)
+        self.assertEqual(posts, [post])
+        self.assertIsNone(next_cursor)
+
+    def test_unfollow_prunes_timeline(self):
+        self.publish(self.author, 'Seguido')
+        Follow.toggle(self.reader, self.author)
+        self.assertEqual(timeline.read_timeline(self.reader)[0], [])
+
+    def test_large_authors_are_merged_on_read(self):
+        first = self.publish(self.author, 'Primeiro')
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0):
+            second = self.publish(self.author, 'Segundo')
+            self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post=second).exists())
+
+            posts, cursor = timeline.read_timeline(self.reader, limit=1)
+            self.assertEqual(posts, [second])
+            posts, cursor = timeline.read_timeline(self.reader, timeline.decode_cursor(cursor), limit=1)
+            self.assertEqual(posts, [first])
+
+
+class HomeViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor')
+        Profile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def create_posts(self, total):
+        for i in range(total):
+            author = User.objects.create_user(username=f'autor{Post.objects.count()}')
+            Profile.objects.create(user=author)
+            post = Post.objects.create(title=f'Post {i}', subscription='...', author=author)
+            post.toggle_like(self.user)
+            Comment.objects.create(post=post, author=author, content='Comentário')
+            Follow.objects.create(follower=self.user, following=author)
+
+    def home_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_query_count_is_constant(self):
+        self.create_posts(10)
+        queries_for_10 = self.home_queries()
+        self.create_posts(90)
+        self.assertEqual(self.home_queries(), queries_for_10)
+
+    def test_page_context(self):
+        self.create_posts(25)
+        response = self.client.get(reverse('home'), {'page': 2})
+        posts = response.context['posts']
+        self.assertEqual(len(posts), 5)
+        self.assertEqual(response.context['liked_posts'], {post.id for post in posts})
+        self.assertEqual(response.context['user_following'], {post.author_id for post in posts})
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.author = User.objects.create_user(username='autor')
+
+    def upload(self, width, height):
+        buffer = BytesIO()
+        Image.new('RGBA', (width, height), (200, 30, 30, 255)).save(buffer, 'PNG')
+        return SimpleUploadedFile('foto.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_generates_variants(self):
+        post = Post.objects.create(title='Foto', subscription='...', author=self.author, photo_post=self.upload(800, 400))
+        post.refresh_from_db()
+
+        self.assertEqual(post.photo_post_variants['source'], post.photo_post.name)
+        self.assertEqual(sorted(post.photo_post_variants['webp'], key=int), ['320', '640', '800'])
+        name = post.photo_post_variants['jpg']['320']
+        self.assertRegex(name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        with post.photo_post.storage.open(name) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 160))
+        self.assertIn(f"{post.photo_post_variants['webp']['640']} 640w", post.photo_post_srcset()['webp'])
+
+    @override_settings(JOB_QUEUE_EAGER=False)
+    def test_photo_replaced_and_restored_gets_variants_again(self):
+        # A -> B -> A: com o storage endereçado por conteúdo a foto A volta com o mesmo nome (e a mesma chave de job)
+        post = Post.objects.create(title='Foto', subscription='...', author=self.author, photo_post=self.upload(200, 100))
+        jobs.run_pending()
+        for size in ((100, 200), (200, 100)):
+            post.refresh_from_db()
+            with self.captureOnCommitCallbacks(execute=True):
+                post.photo_post = self.upload(*size)
+                post.save()
+            jobs.run_pending()
+        post.refresh_from_db()
+        self.assertEqual(post.photo_post_variants['source'], post.photo_post.name)
+        self.assertEqual(list(post.photo_post_variants['jpg']), ['200'])
+        self.assertEqual(Job.objects.filter(name='images.build_variants', status=Job.DONE).count(), 3)
+
+    def test_backfill_command_skips_up_to_date_images(self):
+        post = Post.objects.create(title='Foto', subscription='...', author=self.author, photo_post=self.upload(100, 100))
+        Post.objects.filter(pk=post.pk).update(photo_post_variants={})
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('Post: 1 gerado(s)', out.getvalue())
+
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('Post: 0 gerado(s)', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(list(post.photo_post_variants['jpg']), ['100'])
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.author = User.objects.create_user(username='autor')
+
+    def upload(self, color, name='foto.png'):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def create_post(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Foto', subscription='...', author=self.author, photo_post=upload)
+        post.refresh_from_db()
+        return post
+
+    def test_same_image_is_stored_once_until_last_reference_goes(self):
+        first = self.create_post(self.upload('red'))
+        second = self.create_post(self.upload('red', name='outra.png'))
+
+        self.assertEqual(first.photo_post.name, second.photo_post.name)
+        self.assertEqual(first.photo_post_variants, second.photo_post_variants)
+        self.assertEqual(set(MediaBlob.objects.values_list('refcount', flat=True)), {2})
+        storage = first.photo_post.storage
+        names = [first.photo_post.name, *images.variant_names(first.photo_post_variants)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(storage.exists(name) for name in names))
+        self.assertEqual(set(MediaBlob.objects.values_list('refcount', flat=True)), {1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(any(storage.exists(name) for name in names))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_replaced_profile_photo_is_removed(self):
+        profile = Profile.objects.create(user=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.photo = self.upload('red')
+            profile.save()
+        profile.refresh_from_db()
+        old_names = [profile.photo.name, *images.variant_names(profile.photo_variants)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.photo = self.upload('blue')
+            profile.save()
+        profile.refresh_from_db()
+
+        self.assertFalse(any(profile.photo.storage.exists(name) for name in old_names))
+        self.assertEqual(
+            set(MediaBlob.objects.values_list('name', flat=True)),
+            {profile.photo.name, *images.variant_names(profile.photo_variants)},
+        )
+
+    @override_settings(JOB_QUEUE_EAGER=False)  # As miniaturas ficam para o worker, como em produção
+    def test_upload_is_hashed_while_received(self):
+        upload = self.upload('green')
+        digest = hashlib.sha256(upload.read()).hexdigest()
+        upload.seek(0)
+        token = issue_token(self.author).key
+        response = self.client.post(
+            reverse('api_post_list_create'),
+            {'title': 'Foto', 'subscription': '...', 'author_id': self.author.id, 'photo_post': upload},
+            HTTP_AUTHORIZATION=f'Token {token}',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Post.objects.get().photo_post.name, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.png')
+
+    def test_reconcile_media_fixes_counts_and_removes_orphans(self):
+        post = self.create_post(self.upload('red'))
+        storage = post.photo_post.storage
+        MediaBlob.objects.filter(name=post.photo_post.name).update(refcount=5)
+        orphan = storage.save('img/orfa.png', self.upload('blue'))
+        MediaBlob.objects.filter(name=orphan).delete()  # Como um arquivo de transação desfeita
+
+        out = StringIO()
+        call_command('reconcile_media', min_age=0, stdout=out)
+        self.assertIn('1 contagem(ns) corrigida(s), 1 blob(s) órfão(s) apagado(s)', out.getvalue())
+        self.assertEqual(MediaBlob.objects.get(name=post.photo_post.name).refcount, 1)
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(post.photo_post.name))
+
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record(value, fail_times=0):
+    calls.append(value)
+    if calls.count(value) <= fail_times:
+        raise RuntimeError('falha simulada')
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key_deduplicates(self):
+        jobs.enqueue('tests.record', key='único', value='a')
+        jobs.enqueue('tests.record', key='único', value='a')
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_finished_key_can_be_enqueued_again(self):
+        jobs.enqueue('tests.record', key='único', value='a')
+        jobs.run_pending()
+        jobs.enqueue('tests.record', key='único', value='b')
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ['a', 'b'])
+
+    def test_prune_deletes_old_finished_jobs(self):
+        jobs.enqueue('tests.record', value='a')
+        jobs.run_pending()
+        pending = jobs.enqueue('tests.record', value='b')
+        Job.objects.update(updated_at=timezone.now() - timedelta(days=30))
+        call_command('prune_jobs', days=7, stdout=StringIO())
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [pending.pk])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue('tests.record', value='b', fail_times=1)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('falha simulada', job.last_error)
+        self.assertEqual(jobs.run_pending(), 0)  # Ainda no backoff
+
+        Job.objects.update(run_after=timezone.now())
+        call_command('run_worker', once=True, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_job_gives_up_after_max_attempts(self):
+        job = jobs.enqueue('tests.record', value='c', fail_times=9, max_attempts=1)
+        with self.assertLogs('BlogApp.jobs', 'ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_follow_side_effects_are_queued(self):
+        alice = User.objects.create_user(username='alice')
+        bob = User.objects.create_user(username='bob')
+        Follow.objects.create(follower=alice, following=bob)
+        self.assertEqual(list(Job.objects.values_list('name', flat=True)), ['timeline.backfill_author'])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='leitor')
+        Profile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def test_fingerprint_groups_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'a''b' AND x IN (1, 2, 3)"),
+            fingerprint("SELECT * FROM t WHERE id = 7 AND name = 'c' AND x IN (4)"),
+        )
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse('home'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)  # Nem mesmo de 127.0.0.1
+        with override_settings(METRICS_TOKEN='segredo'):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer errado').status_code, 403)
+            body = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+        self.assertIn('blog_view_requests_total{view="home"} 1', body)
+        self.assertIn('# TYPE blog_view_queries_total counter', body)
+
+    @override_settings(QUERY_BUDGETS={'profile_detail': 1})
+    def test_budget_from_settings_fails_in_tests(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(f'/profile/{self.user.id}/')
+
+    @override_settings(QUERY_BUDGETS={'profile_detail': 1}, QUERY_BUDGET_RAISE=False)
+    def test_budget_only_logs_in_production(self):
+        with self.assertLogs('BlogApp.instrumentation', 'WARNING'):
+            response = self.client.get(f'/profile/{self.user.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('blog_view_query_budget_exceeded_total{view="profile_detail"} 1', metrics.render())
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_seed_and_benchmark_write_json(self):
+        call_command('seed_blog', users=20, posts=30, comments=40, likes=60, follows=50, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(
+            Profile.objects.order_by('-followers_count').first().followers_count,
+            Follow.objects.values('following').annotate(total=Count('*')).order_by('-total')[0]['total'],
+        )
+
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        only = ['post_serializer', 'post_projection', 'render_orjson', 'like_toggle']
+        call_command('benchmark', repeat=1, warmup=0, only=only, output=output, stdout=StringIO())
+        with open(output) as result_file:
+            report = json.load(result_file)
+        self.assertEqual(set(report['results']), set(only))
+        # Mesmas queries: a página e a prévia dos comentários, mais o 'curti'
+        self.assertEqual(report['results']['post_projection']['queries'], report['results']['post_serializer']['queries'])
+        self.assertEqual(report['dataset']['posts'], 30)
+
+    @override_settings(JOB_QUEUE_EAGER=False)
+    def test_benchmark_sessions_compares_engines(self):
+        call_command('seed_blog', users=5, posts=5, comments=5, likes=5, follows=5, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_sessions', requests=1, stdout=out)
+        lines = [line.split() for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual({(line[0], line[1]) for line in lines}, {
+            (page, mode) for page in ('home', 'post', 'perfil', 'comentário') for mode in ('db', 'cached_db', 'signed_cookies')
+        })
+        sessions = {(line[0], line[1]): line[3] for line in lines}
+        self.assertEqual(sessions[('home', 'db')], '1.0/0.0')
+        self.assertEqual(sessions[('home', 'cached_db')], '0.0/0.0')
+
+
+class ImportBlogDataTests(TestCase):
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as output:
+            output.write(content)
+        return path
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_import_streams_files_and_recounts_once(self):
+        users = self.write('users.jsonl', '\n'.join(json.dumps(row) for row in [
+            {'id': 10, 'username': 'ana', 'email': 'ana@example.com'},
+            {'id': 11, 'username': 'beto', 'email': 'beto@example.com'},
+        ]))
+        posts = self.write('posts.jsonl', json.dumps(
+            {'id': 20, 'title': 'Antigo', 'subscription': '...', 'author_id': 10, 'created_at': '2020-01-02T03:04:05+00:00'}
+        ))
+        comments = self.write('comments.csv', 'post_id,author_id,content\n20,11,"Oi, tudo bem?"\n')
+        likes = self.write('likes.jsonl', json.dumps({'user_id': 11, 'post_id': 20}))
+        follows = self.write('follows.csv', 'follower_id,following_id\n11,10\n')
+
+        out = StringIO()
+        call_command(
+            'import_blog_data', users=users, posts=posts, comments=comments, likes=likes, follows=follows,
+            default_password='segredo', stdout=out,
+        )
+
+        self.assertIn('linhas/s', out.getvalue())
+        post = Post.objects.get(pk=20)
+        self.assertEqual(post.created_at.year, 2020)
+        self.assertEqual(post.likes_count, 1)
+        self.assertEqual(post.comments.get().content, 'Oi, tudo bem?')
+        self.assertEqual(Profile.objects.get(user_id=10).followers_count, 1)
+        self.assertEqual(Profile.objects.get(user_id=11).following_count, 1)
+        self.assertTrue(User.objects.get(pk=10).check_password('segredo'))
+        # As datas automáticas voltam a funcionar depois da importação
+        self.assertGreater(Post.objects.create(title='Novo', subscription='...', author_id=10).created_at.year, 2020)
+
+    def test_copy_buffer_serializes_json_fields(self):
+        # O caminho do COPY só roda no PostgreSQL; o CSV que ele envia é conferido aqui
+        author = User.objects.create_user(username='ana')
+        variants = {'source': 'img/a.png', 'webp': {'320': 'img/a "320".webp'}}
+        rows = [
+            (Profile, Profile(user=author, photo_variants=variants, bio='Diz "oi"')),
+            (Post, Post(pk=1, title='T', subscription='...', author=author, photo_post_variants=variants, created_at=timezone.now(), updated_at=timezone.now())),
+        ]
+        for model, obj in rows:
+            fields = [field for field in model._meta.concrete_fields if not (field.primary_key and obj.pk is None)]
+            cells = next(csv.reader(copy_buffer(fields, [obj])))
+            values = dict(zip((field.attname for field in fields), cells))
+            variants_field = 'photo_variants' if model is Profile else 'photo_post_variants'
+            self.assertEqual(json.loads(values[variants_field]), variants)
+
+
+class ExportBlogDataTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='autor')
+        self.reader = User.objects.create_user(username='leitor')
+        self.post = Post.objects.create(title='Primeiro', subscription='...', author=self.author)
+        Comment.objects.create(post=self.post, author=self.reader, content='Oi')
+        self.post.toggle_like(self.reader)
+        Follow.objects.create(follower=self.reader, following=self.author)
+
+    def export(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('export_blog_data', *args, stdout=out, stderr=err)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_full_export_then_incremental(self):
+        rows = self.export()
+        self.assertEqual([row['type'] for row in rows], ['post', 'comment', 'like', 'follow', 'watermark'])
+        self.assertEqual(rows[0]['likes_count'], 1)
+
+        # Só o que mudou depois do watermark entra na exportação seguinte
+        self.post.title = 'Editado'
+        self.post.save()
+        Comment.objects.create(post=self.post, author=self.author, content='Novo')
+        rows = self.export('--since', rows[-1]['watermark'])
+        self.assertEqual([(row['type'], row.get('title') or row.get('content')) for row in rows[:-1]], [
+            ('post', 'Editado'), ('comment', 'Novo'),
+        ])
+        self.assertEqual(self.export('--since', rows[-1]['watermark'])[:-1], [])
+
+    def test_gzip_output_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'export.ndjson.gz')
+        call_command('export_blog_data', '--output', path, '--types', 'posts', stderr=StringIO())
+        with gzip.open(path, 'rt') as source:
+            rows = [json.loads(line) for line in source]
+        self.assertEqual([row['type'] for row in rows], ['post', 'watermark'])
+
+    def test_invalid_watermark(self):
+        with self.assertRaises(CommandError):
+            self.export('--since', 'nao-e-um-watermark')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='autor')
+
+    def post(self, title, subscription='...'):
+        return Post.objects.create(title=title, subscription=subscription, author=self.author)
+
+    def test_ranks_title_above_description_and_comments(self):
+        in_comment = self.post('Outro assunto')
+        Comment.objects.create(post=in_comment, author=self.author, content='Receita de pão de queijo')
+        in_description = self.post('Cozinha', 'Um pão caseiro')
+        in_title = self.post('Pão francês')
+        self.post('Nada a ver')
+
+        posts, next_cursor = search.search_posts('pao')
+        self.assertEqual(posts, [in_title, in_description, in_comment])
+        self.assertIsNone(next_cursor)
+
+    def test_index_follows_edits_and_deletes(self):
+        post = self.post('Viagem')
+        comment = Comment.objects.create(post=post, author=self.author, content='Que praia linda')
+        self.assertEqual(search.search_posts('praia')[0], [post])
+
+        comment.delete()
+        self.assertEqual(search.search_posts('praia')[0], [])
+        post.title = 'Montanha'
+        post.save()
+        self.assertEqual(search.search_posts('viagem')[0], [])
+        self.assertEqual(search.search_posts('montanha')[0], [post])
+        post.delete()
+        self.assertEqual(search.search_posts('montanha')[0], [])
+
+    @override_settings(JOB_QUEUE_EAGER=False)
+    def test_pending_reindex_jobs_are_merged(self):
+        post = self.post('Viagem')
+        Comment.objects.create(post=post, author=self.author, content='Que praia linda')
+        post.title = 'Montanha'
+        post.save()
+        jobs_for_post = Job.objects.filter(name='search.index_posts', idempotency_key=f'search.index:{post.pk}')
+        self.assertEqual(jobs_for_post.count(), 1)
+        # Os comentários apagados junto com o post não reindexam o post que está saindo do índice
+        jobs_for_post.delete()
+        post.delete()
+        self.assertFalse(Job.objects.filter(name='search.index_posts').exists())
+
+    def test_keyset_pages_cover_every_match_once(self):
+        posts = [self.post(f'Futebol {i}') for i in range(7)]
+        seen, cursor = [], None
+        while True:
+            page, cursor = search.search_posts('futebol', cursor and search.decode_cursor(cursor), limit=3)
+            seen.extend(page)
+            if cursor is None:
+                break
+        self.assertCountEqual(seen, posts)
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_rebuild_command(self):
+        post = self.post('Xadrez')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(search.search_posts('xadrez')[0], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search_posts('xadrez')[0], [post])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.post('Receitas')
+        self.assertEqual(search.search_posts('"receitas" (*')[0], list(Post.objects.all()))
+        self.assertEqual(search.search_posts('?!')[0], [])
+
+
+class ExplainQueriesTests(TestCase):
+    def test_requires_data(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', stdout=StringIO())
+
+    def test_explains_each_view(self):
+        reader = User.objects.create_user(username='leitor')
+        author = User.objects.create_user(username='autor')
+        Profile.objects.create(user=reader)
+        Profile.objects.create(user=author)
+        Follow.objects.create(follower=reader, following=author)
+        Post.objects.create(title='Post', subscription='...', author=reader)
+
+        out = StringIO()
+        call_command('explain_queries', '--check', stdout=out)
+        for view in ('home', 'post_detail', 'profile', 'api_feed', 'api_timeline', 'timeline.fan_out'):
+            self.assertIn(f'{view}: ', out.getvalue())
+        self.assertIn('0 seq scan(s)', out.getvalue())
+
+
+@override_settings(LOGIN_MAX_FAILURES_PER_ACCOUNT=3, LOGIN_MAX_FAILURES_PER_IP=5)
+class LoginPipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            username='ana', email='Ana@Example.com', password=make_password('senha123', hasher='pbkdf2_sha256'),
+        )
+
+    def login(self, email, password, ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'email': email, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_email_lookup_ignores_case_and_upgrades_hash(self):
+        response = self.login(' ana@example.COM', 'senha123')
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+    def test_account_is_throttled_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('ana@example.com', 'errada').status_code, 200)
+        with mock.patch('BlogApp.auth.authenticate') as authenticate:
+            response = self.login('ana@example.com', 'senha123', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+
+    def test_ip_is_throttled_across_accounts(self):
+        for i in range(5):
+            self.login(f'ninguem{i}@example.com', 'x')
+        self.assertEqual(self.login('ana@example.com', 'senha123').status_code, 429)
+        self.assertEqual(self.login('ana@example.com', 'senha123', ip='10.0.0.9').status_code, 302)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_ip_behind_proxy_comes_from_forwarded_for(self):
+        # Todos chegam do proxy em 127.0.0.1; o limite é por cliente, e o início forjado do cabeçalho é ignorado
+        for i in range(5):
+            self.client.post(
+                reverse('login'), {'email': f'ninguem{i}@example.com', 'password': 'x'},
+                REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR=f'10.9.9.{i}, 203.0.113.5',
+            )
+        response = self.client.post(
+            reverse('login'), {'email': 'ana@example.com', 'password': 'senha123'},
+            REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.5',
+        )
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(
+            reverse('login'), {'email': 'ana@example.com', 'password': 'senha123'},
+            REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.7',
+        )
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_short_forwarded_for_falls_back_to_remote_addr(self):
+        # Só um proxy acrescentou entrada: a primeira foi escrita pelo cliente e não vale
+        request = RequestFactory().post('/', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='10.9.9.9')
+        self.assertEqual(auth.client_ip(request), '127.0.0.1')
+        request = RequestFactory().post('/', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='10.9.9.9, 203.0.113.5, 10.0.0.1')
+        self.assertEqual(auth.client_ip(request), '203.0.113.5')
+
+    def test_success_resets_account_failures(self):
+        for _ in range(2):
+            self.login('ana@example.com', 'errada')
+        self.assertEqual(self.login('ana@example.com', 'senha123').status_code, 302)
+        for _ in range(2):
+            self.login('ana@example.com', 'errada')
+        self.assertEqual(self.login('ana@example.com', 'senha123').status_code, 302)
+
+
+class SessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        Profile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def test_pages_read_session_and_user_from_cache(self):
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+        sql = '\n'.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('FROM "auth_user" WHERE', sql)
+
+    def test_unchanged_session_is_not_saved(self):
+        store = SessionStore(self.client.session.session_key)
+        store[SESSION_KEY] = store[SESSION_KEY]
+        self.assertTrue(store.modified)
+        with self.assertNumQueries(0):
+            store.save()
+
+        store['tema'] = 'escuro'
+        store.save()
+        self.assertEqual(SessionStore(store.session_key).load()['tema'], 'escuro')
+
+    def test_password_change_drops_cached_user(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('outra-senha')
+            self.user.save()
+        response = self.client.get(reverse('home'))
+        self.assertRedirects(response, f"{reverse('login')}?next=/", fetch_redirect_response=False)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # replica1 espelha o banco de testes (ver DATABASES); fora de uma transação, ela enxerga o que o primário gravou
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        self.post = Post.objects.create(title='Post', subscription='...', author=User.objects.create_user(username='autor'))
+        self.headers = {'HTTP_AUTHORIZATION': f'Token {issue_token(self.user).key}'}
+
+    def queries(self, method, url):
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica1']) as replica:
+            response = getattr(self.client, method)(url, **self.headers)
+        self.assertLess(response.status_code, 300)
+        return len(primary), len(replica)
+
+    def test_reads_go_to_replica_until_the_client_writes(self):
+        _, replica = self.queries('get', reverse('api_post_list_create'))
+        self.assertGreater(replica, 0)
+
+        _, replica = self.queries('post', reverse('api_post_like', args=[self.post.pk]))
+        self.assertEqual(replica, 0)
+
+        # Logo depois do like, o mesmo cliente lê do primário
+        _, replica = self.queries('get', reverse('api_post_list_create'))
+        self.assertEqual(replica, 0)
+
+        cache.delete(routers.sticky_key(self.headers['HTTP_AUTHORIZATION']))  # Fim da janela de read-your-writes
+        _, replica = self.queries('get', reverse('api_post_list_create'))
+        self.assertGreater(replica, 0)
+
+    def test_cache_fills_read_from_primary(self):
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica1']) as replica:
+            self.client.get(reverse('api_post_list_create'), **self.headers)
+        # A página vai para o cache compartilhado: lida do primário; o 'curti', por usuário, segue na réplica
+        self.assertTrue(any('"BlogApp_comment"' in query['sql'] for query in primary))
+        self.assertFalse(any('"BlogApp_comment"' in query['sql'] for query in replica))
+        self.assertTrue(any('"BlogApp_like"' in query['sql'] for query in replica))
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        self.addCleanup(routers._unavailable.clear)
+        with mock.patch.object(connections['replica1'], 'close_if_health_check_failed', side_effect=OperationalError('fora do ar')):
+            with self.assertLogs('BlogApp.routers', 'WARNING'):
+                primary, replica = self.queries('get', reverse('api_post_list_create'))
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+        self.assertIn('replica1', routers._unavailable)
+
+    def test_outside_requests_everything_uses_primary(self):
+        self.assertEqual(Post.objects.all().db, 'default')
@@ -0,0 +1,102 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Post, Follow, Profile, TimelineEntry
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def encode_cursor(created_at, post_id):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{post_id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Converte o cursor em (created_at, post_id). Levanta ValueError se for inválido."""
+    created_at, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(post_id)
+
+
+def _before(created_at_field, id_field, cursor):
+    created_at, post_id = cursor
+    return Q(**{f'{created_at_field}__lt': created_at}) | Q(**{created_at_field: created_at, f'{id_field}__lt': post_id})
+
+
+def uses_fanout(author_id):
+    followers_count = Profile.objects.filter(user_id=author_id).values_list('followers_count', flat=True).first()
+    return (followers_count or 0) <= settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out(post):
+    """Grava o post na caixa de entrada do autor e de cada seguidor, em lotes.
+
+    Autores acima de TIMELINE_FANOUT_MAX_FOLLOWERS só recebem a entrada própria;
+    seus posts entram na timeline dos seguidores na leitura (fan-out na leitura).
+    """
+    TimelineEntry.objects.get_or_create(user_id=post.author_id, post=post, defaults={'created_at': post.created_at})
+    if not uses_fanout(post.author_id):
+        return
+
+    follower_ids = (
+        Follow.objects.filter(following_id=post.author_id)
+        .values_list('follower_id', flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(TimelineEntry(user_id=follower_id, post_id=post.pk, created_at=post.created_at))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_author(user_id, author_id):
+    """Traz os posts recentes de um autor recém-seguido para a timeline do usuário."""
+    if not uses_fanout(author_id):
+        return
+    recent = Post.objects.filter(author_id=author_id).order_by('-created_at', '-id').values_list('id', 'created_at')
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, created_at=created_at)
+            for post_id, created_at in recent[:settings.TIMELINE_BACKFILL_SIZE]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id, author_id):
+    """Remove da timeline do usuário os posts de um autor que ele deixou de seguir."""
+    TimelineEntry.objects.filter(user_id=user_id, post__author_id=author_id).delete()
+
+
+def read_timeline(user, cursor=None, limit=20):
+    """Retorna (posts, próximo cursor) da timeline 'seguindo' do usuário.
+
+    A caixa de entrada é lida com uma única varredura do índice (user, -created_at, -post).
+    Posts de autores grandes demais para o fan-out são mesclados por keyset na leitura.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    if cursor is not None:
+        entries = entries.filter(_before('created_at', 'post_id', cursor))
+    rows = list(entries.order_by('-created_at', '-post_id').values_list('created_at', 'post_id')[:limit])
+
+    pulled_authors = list(
+        Follow.objects.filter(
+            follower=user,
+            following__profile__followers_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS,
+        ).values_list('following_id', flat=True)
+    )
+    if pulled_authors:
+        pulled = Post.objects.filter(author_id__in=pulled_authors)
+        if cursor is not None:
+            pulled = pulled.filter(_before('created_at', 'id', cursor))
+        rows.extend(pulled.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit])
+        rows = sorted(set(rows), reverse=True)[:limit]
+
+    posts = Post.objects.for_feed().in_bulk([post_id for _, post_id in rows])
+    next_cursor = encode_cursor(*rows[-1]) if len(rows) == limit else None
+    return [posts[post_id] for _, post_id in rows if post_id in posts], next_cursor
@@ -1,41 +1,58 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib import messages
 from django.contrib.auth.models import User
 from .models import Post, Follow, Comment, Profile, Like
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
+from django.db.models import Q
+from django.http import Http404, JsonResponse
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from BlogApp.forms import ProfileForm, CommentForm
+from .auth import LoginThrottled, find_by_email, login_attempt
+from . import timeline
+from .cache import cached, feed_key, post_key
 
 # View para a página inicial exibindo os posts
 class HomeView(LoginRequiredMixin, ListView):
-    model = Post
     template_name = 'home.html'
     context_object_name = 'posts'
     login_url = '/login/'
+    paginate_by = 20
+    query_budget = 10  # Limite de queries por request (ver BlogApp.instrumentation)
+
+    def get_queryset(self):
+        # Autor, perfil e prévia dos comentários vêm em um número fixo de queries
+        return Post.objects.for_feed().order_by('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        # Os posts da página são os mesmos para todos os usuários; o que é pessoal fica no contexto
+        page.object_list = cached(feed_key('home', page.number, page_size), lambda: list(object_list))
+        return paginator, page, page.object_list, is_paginated
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        posts = context['posts']
 
-        # Adiciona a lista de comentários para cada post
-        for post in context['posts']:
-            post.comments_list = list(post.comments.all())
-            
+        # Adiciona a prévia dos comentários (já carregada) para cada post
+        for post in posts:
+            post.comments_list = post.comments_preview()
 
         # Obter o perfil do usuário atual
         user_profile, _ = Profile.objects.get_or_create(user=self.request.user)
 
-        # Obter os IDs dos posts que o usuário curtiu
-        liked_posts = Like.objects.filter(user=self.request.user).values_list('post_id', flat=True)
-        context['liked_posts'] = set(liked_posts)
+        # Obter, entre os posts da página, os IDs dos que o usuário curtiu
+        context['liked_posts'] = Like.liked_post_ids(self.request.user, [post.id for post in posts])
 
-        # Obter os usuários que o usuário atual está seguindo
-        user_following = Follow.objects.filter(follower=self.request.user).values_list('following_id', flat=True)
+        # Obter, entre os autores da página, os que o usuário atual está seguindo
+        user_following = Follow.objects.filter(
+            follower=self.request.user,
+            following_id__in={post.author_id for post in posts},
+        ).values_list('following_id', flat=True)
         context['user_following'] = set(user_following)
 
         return context
@@ -44,23 +61,45 @@ class HomeView(LoginRequiredMixin, ListView):
 class LikePostView(LoginRequiredMixin, View):
     def post(self, request, pk):
         post = get_object_or_404(Post, id=pk)
-        
-        if post.likes.filter(id=request.user.id).exists():
-            post.likes.remove(request.user)
-        else:
-            post.likes.add(request.user)
-            
+        post.toggle_like(request.user)
         return redirect('home')
         
         
 # View para ver detalhes do post
 class PostView(LoginRequiredMixin, View):
+    query_budget = {'GET': 6, 'POST': 8}
+
+    comments_per_page = 20
+
     def get(self, request, pk):
-        post = get_object_or_404(Post, id=pk)
-        comments = post.comments.all()  # Obter todos os comentários do post
+        # Comentários do mais recente para o mais antigo, por cursor (created_at, id) em ?antes=
+        cursor = request.GET.get('antes')
+        try:
+            before = timeline.decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise Http404("Cursor inválido.")
+        post, comments, next_cursor = cached(
+            post_key(pk, 'detail', cursor), lambda: self.load_post(pk, before, self.comments_per_page),
+        )
         form = CommentForm()  # Formulário vazio para ser preenchido
 
-        return render(request, 'post_detail.html', {'post': post, 'comments': comments, 'form': form})
+        return render(request, 'post_detail.html', {
+            'post': post, 'comments': comments, 'next_cursor': next_cursor, 'form': form,
+        })
+
+    @staticmethod
+    def load_post(pk, before, limit):
+        post = get_object_or_404(Post, id=pk)
+        comments = post.comments.select_related('author').order_by('-created_at', '-id')
+        if before is not None:
+            created_at, comment_id = before
+            comments = comments.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=comment_id))
+        comments = list(comments[:limit + 1])  # Um a mais só para saber se há outra página
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = timeline.encode_cursor(comments[-1].created_at, comments[-1].pk)
+        return post, comments, next_cursor
 
     def post(self, request, pk):
         post = get_object_or_404(Post, id=pk)
@@ -84,16 +123,8 @@ class FollowUserView(LoginRequiredMixin, View):
         if user_to_follow == request.user:
             return JsonResponse({'error': 'Você não pode seguir a si mesmo.'}, status=400)
 
-        follow, created = Follow.objects.get_or_create(follower=request.user, following=user_to_follow)
-
-        if not created:
-            follow.delete()  # Deixar de seguir
-            following = False
-        else:
-            following = True  # Seguir
-
-        # Contagem de seguidores
-        followers_count = Follow.objects.filter(following=user_to_follow).count()
+        # Segue ou deixa de seguir; os contadores são atualizados na mesma transação
+        following, followers_count = Follow.toggle(request.user, user_to_follow)
 
         # Passa o status de "seguindo" e a nova contagem de seguidores
         return JsonResponse({
@@ -119,7 +150,7 @@ class RegisterView(View):
             messages.error(request, "O nome de usuário já existe.")
             return render(request, 'register.html')
 
-        if User.objects.filter(email=email).exists():
+        if find_by_email(email) is not None:
             messages.error(request, "Este email já está registrado.")
             return render(request, 'register.html')
 
@@ -168,17 +199,16 @@ class LoginView(View):
         password = request.POST.get('password')
 
         try:
-            user = User.objects.get(email=email)
-            user = authenticate(request, username=user.username, password=password)
-
-            if user is not None:
-                login(request, user)
-                return redirect('home')
-            else:
-                messages.error(request, 'Credenciais inválidas')
-        except User.DoesNotExist:
-            messages.error(request, 'Usuário com este e-mail não existe')
-
+            user = login_attempt(request, password, email=email)
+        except LoginThrottled:
+            messages.error(request, 'Muitas tentativas de login. Tente novamente mais tarde.')
+            return render(request, self.template_name, status=429)
+
+        if user is not None:
+            login(request, user)
+            return redirect('home')
+        # A mesma mensagem para e-mail inexistente e senha errada, para não revelar quem tem conta
+        messages.error(request, 'Credenciais inválidas')
         return render(request, self.template_name)
 
 # Logout
@@ -0,0 +1,215 @@
+import asyncio
+from calendar import timegm
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from BlogApp import cache as blog_cache
+from BlogApp import realtime
+from BlogApp.models import Post, Profile, Like
+from .authentication import CachedTokenAuthentication
+from .conditional import feed_validators, post_validators, profile_validators
+from .pagination import FeedCursorPagination
+from .projections import comment_rows, post_rows, serialize_posts
+from .renderers import ORJSONRenderer
+from .serializers import PostSerializer, ProfileSerializer
+from .views import PostListCreateView, PostDetailView, ProfileDetailView
+
+
+def render(data, status=status.HTTP_200_OK, **headers):
+    # Mesmo renderer das views DRF
+    response = HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+    for name, value in headers.items():
+        response.headers[name] = value
+    return response
+
+
+def unauthorized(detail):
+    return render({'detail': detail}, status.HTTP_401_UNAUTHORIZED, **{'WWW-Authenticate': 'Token'})
+
+
+async def liked_post_ids(user, post_ids):
+    """Like.liked_post_ids() assíncrono; post_ids pode ser uma subquery."""
+    return {post_id async for post_id in Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)}
+
+
+class AsyncReadView(View):
+    """GET assíncrono de uma rota de leitura da API; os demais métodos seguem na view DRF síncrona.
+
+    Autenticação por token, ETag/Last-Modified (os validadores de api.conditional) e limite de
+    queries são os da view síncrona. O ORM é usado pela API assíncrona (aget, async for) e as
+    consultas independentes de um request são disparadas juntas com asyncio.gather.
+    """
+    sync_view_class = None
+    validators = None
+    sync_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # csrf_exempt como nas views DRF: a API autentica por token
+        return csrf_exempt(super().as_view(sync_view=cls.sync_view_class.as_view(), **initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return self.read(request, *args, **kwargs)
+        return sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    async def read(self, request, *args, **kwargs):
+        try:
+            auth = await CachedTokenAuthentication().aauthenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            return unauthorized(exc.detail)
+        if auth is None:
+            return unauthorized(exceptions.NotAuthenticated.default_detail)
+        request.user, request.auth = auth
+
+        # Mesmo fluxo de django.views.decorators.http.condition, que não aceita views assíncronas
+        etag, last_modified = await sync_to_async(self.validators)(request, **kwargs)
+        etag = quote_etag(etag) if etag is not None else None
+        last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await self.get(request, *args, **kwargs)
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AsyncFeedView(AsyncReadView):
+    """Feed da API (GET /api/posts/) por cursor keyset (created_at, id), como a timeline."""
+    sync_view_class = PostListCreateView
+    validators = staticmethod(feed_validators)
+    query_budget = PostListCreateView.query_budget
+
+    async def get(self, request):
+        paginator = FeedCursorPagination()
+        try:
+            cursor = paginator.get_cursor(request.GET)
+        except ValueError:
+            return render({'detail': "Cursor inválido."}, status.HTTP_400_BAD_REQUEST)
+        page_size = paginator.get_page_size(request.GET)
+        page = paginator.order(Post.objects.all(), cursor)[:page_size + 1]
+        computed = {}
+
+        async def compute():
+            # Posts e 'curti' saem em paralelo: o segundo usa a página como subquery, sem esperar o primeiro
+            posts, computed['liked'] = await asyncio.gather(
+                self.rows(post_rows(page)),
+                liked_post_ids(request.user, page.values('id')),
+            )
+            posts, next_url = paginator.next_link(request, posts, page_size)
+            comments = await self.rows(comment_rows([post['id'] for post in posts]))
+            results = serialize_posts(posts, comments, request, computed['liked'])
+            return {'next': next_url, 'previous': None, 'results': results}
+
+        # Mesma página da view síncrona (mesmo cursor e mesmo JSON): as duas rotas dividem o cache
+        key = await sync_to_async(blog_cache.feed_key)('api', request.get_host(), request.get_full_path())
+        data = await blog_cache.acached(key, compute)
+        liked = computed.get('liked')
+        if liked is None:
+            liked = await liked_post_ids(request.user, [post['id'] for post in data['results']])
+        for post in data['results']:
+            post['liked'] = post['id'] in liked
+        return render(data)
+
+    @staticmethod
+    async def rows(queryset):
+        return [row async for row in queryset]
+
+
+class AsyncPostDetailView(AsyncReadView):
+    sync_view_class = PostDetailView
+    validators = staticmethod(post_validators)
+
+    async def get(self, request, pk):
+        post, liked = await asyncio.gather(
+            Post.objects.for_feed().filter(pk=pk).afirst(),
+            Like.objects.filter(post_id=pk, user=request.user).aexists(),
+        )
+        if post is None:
+            return render({'detail': exceptions.NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+        if not (post.author_id == request.user.pk or request.user.is_staff):
+            return render(
+                {'detail': "Você não tem permissão para editar ou excluir este post."}, status.HTTP_403_FORBIDDEN,
+            )
+        context = {'request': request, 'liked_post_ids': {post.pk} if liked else set()}
+        return render(PostSerializer(post, context=context).data)
+
+
+class AsyncProfileDetailView(AsyncReadView):
+    sync_view_class = ProfileDetailView
+    validators = staticmethod(profile_validators)
+
+    async def get(self, request, pk):
+        try:
+            profile = await Profile.objects.select_related('user').aget(pk=pk)
+        except Profile.DoesNotExist:
+            return render({'detail': exceptions.NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+        if profile.user_id != request.user.pk and not request.user.is_staff:
+            return render(
+                {'detail': "Você não tem permissão para editar ou excluir este perfil."}, status.HTTP_403_FORBIDDEN,
+            )
+        return render(ProfileSerializer(profile, context={'request': request}).data)
+
+
+class EventStreamView(View):
+    """Eventos de like, comentário e follow por Server-Sent Events (GET /api/events/?topics=post:1,user:2).
+
+    Tópicos: post:<id> (likes e comentários do post) e user:<id> (follows do usuário e likes e
+    comentários nos seus posts); sem 'topics', só o do próprio usuário. Aceita token, como o resto da
+    API, ou a sessão, para o EventSource de home.html. A conexão fica aberta só no event loop, sem
+    thread nem conexão de banco, então só é servida em ASGI.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return render({"error": "Eventos em tempo real exigem o servidor ASGI."}, status.HTTP_501_NOT_IMPLEMENTED)
+        try:
+            auth = await CachedTokenAuthentication().aauthenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            return unauthorized(exc.detail)
+        user = auth[0] if auth is not None else await request.auser()
+        if not user.is_authenticated:
+            return unauthorized(exceptions.NotAuthenticated.default_detail)
+
+        topics = [topic.strip() for topic in request.GET.get('topics', '').split(',') if topic.strip()]
+        topics = topics or [realtime.user_topic(user.pk)]
+        if len(topics) > settings.REALTIME_MAX_TOPICS or not all(realtime.TOPIC.match(topic) for topic in topics):
+            return render(
+                {"error": f"Informe até {settings.REALTIME_MAX_TOPICS} tópicos post:<id> ou user:<id>."},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Inscrito antes de responder: nada publicado depois deste ponto se perde
+        broker = realtime.broker()
+        subscription = await broker.subscribe(topics)
+        response = StreamingHttpResponse(self.stream(broker, subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx não segura os eventos em buffer
+        return response
+
+    @staticmethod
+    async def stream(broker, subscription):
+        try:
+            yield 'retry: 3000\n\n'  # O EventSource reconecta 3 s após uma queda
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.get(), settings.REALTIME_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'  # Comentário SSE: mantém proxies e balanceadores com a conexão aberta
+        finally:
+            # Cliente desconectou (o handler ASGI cancela o stream) ou o servidor está encerrando
+            await broker.unsubscribe(subscription)
@@ -0,0 +1,117 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+TOKEN_KEY = 'api:token:{}'
+
+
+def token_cache_key(key):
+    # O token em si não vai para o cache, só um hash dele
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def is_expired(created):
+    """Com API_TOKEN_TTL (segundos) definido, tokens mais antigos que isso deixam de valer."""
+    ttl = settings.API_TOKEN_TTL
+    return bool(ttl) and created + timedelta(seconds=ttl) < timezone.now()
+
+
+class TokenExpired(exceptions.AuthenticationFailed):
+    default_detail = "Token expirado."
+
+
+def issue_token(user):
+    """Retorna o token do usuário, trocando-o por um novo se tiver expirado."""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_expired(token.created):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def rotate_token(user):
+    """Apaga o token atual do usuário (se houver) e emite outro."""
+    Token.objects.filter(user=user).delete()
+    return Token.objects.create(user=user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication que guarda token -> usuário em cache por API_TOKEN_CACHE_TIMEOUT segundos.
+
+    A entrada é apagada quando o token é excluído (logout, rotação) ou o usuário é alterado
+    (ver api.signals), então o timeout curto só limita por quanto tempo um erro passaria despercebido.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        entry = cache.get(cache_key)
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Token inválido.")
+            entry = (token.user, token.created)
+            cache.set(cache_key, entry, settings.API_TOKEN_CACHE_TIMEOUT)
+
+        try:
+            return self.check_entry(key, entry)
+        except TokenExpired:
+            Token.objects.filter(key=key).delete()
+            raise
+
+    @staticmethod
+    def check_entry(key, entry):
+        """Valida a entrada (usuário, criação do token) do cache e retorna (user, token).
+
+        Comum aos caminhos síncrono e assíncrono; levanta TokenExpired para quem chamou apagar o
+        token, cada um com a sua API do ORM.
+        """
+        user, created = entry
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed("Usuário inativo ou excluído.")
+        if is_expired(created):
+            raise TokenExpired()
+        # Mesmo formato do TokenAuthentication: request.auth é o Token, aqui sem ir ao banco
+        return user, Token(key=key, user=user, created=created)
+
+    async def aauthenticate(self, request):
+        """authenticate() para as views assíncronas (api.async_views), sobre um HttpRequest do Django.
+
+        Mesmas regras de authenticate_credentials(), com cache e banco acessados por aget()/aset().
+        Retorna (user, token) ou None sem cabeçalho de token; levanta AuthenticationFailed.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Cabeçalho de token inválido.")
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Cabeçalho de token inválido.")
+
+        cache_key = token_cache_key(key)
+        entry = await cache.aget(cache_key)
+        if entry is None:
+            try:
+                token = await Token.objects.select_related('user').aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed("Token inválido.")
+            entry = (token.user, token.created)
+            await cache.aset(cache_key, entry, settings.API_TOKEN_CACHE_TIMEOUT)
+
+        try:
+            return self.check_entry(key, entry)
+        except TokenExpired:
+            await Token.objects.filter(key=key).adelete()
+            raise
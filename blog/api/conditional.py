@@ -0,0 +1,90 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Exists, Max, OuterRef
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from BlogApp import cache as blog_cache
+from BlogApp.models import Post, Like, Profile
+
+
+def conditional(validators):
+    """condition() do Django para um método GET de APIView.
+
+    validators(request, **kwargs) devolve (etag, last_modified) a partir de agregados baratos,
+    sem montar o corpo; se baterem com If-None-Match/If-Modified-Since a resposta é 304.
+    Devolver (None, None) desliga a verificação (ex.: objeto inexistente, a view responde 404).
+    Cache-Control private/no-cache faz o cliente guardar a resposta e revalidar sempre.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            computed = []
+
+            def compute(request, *args, **kwargs):
+                if not computed:
+                    computed.append(validators(request, **kwargs))
+                return computed[0]
+
+            view = condition(
+                etag_func=lambda request, *args, **kwargs: compute(request, *args, **kwargs)[0],
+                last_modified_func=lambda request, *args, **kwargs: compute(request, *args, **kwargs)[1],
+            )(lambda request, *args, **kwargs: method(self, request, *args, **kwargs))
+            response = view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def feed_validators(request, **kwargs):
+    """Página do feed: versão do cache do feed e último post criado/editado, por usuário (campo 'liked').
+
+    Só ETag, sem Last-Modified: likes, comentários e exclusões mudam a página sem mudar nenhum
+    updated_at (os contadores são gravados com update()), mas sempre mudam a versão do feed.
+    """
+    latest = Post.objects.aggregate(updated_at=Max('updated_at'), id=Max('id'))
+    etag = _etag(request.user.pk, request.get_full_path(), blog_cache.feed_version(), latest['updated_at'], latest['id'])
+    return etag, None
+
+
+def post_validators(request, pk, **kwargs):
+    """Post: edição, likes, contagem e último comentário, foto do autor e o 'liked' do usuário, em uma query.
+
+    Só ETag, como no feed: um unlike ou um comentário apagado não deixam data mais recente.
+    """
+    posts = Post.objects.filter(pk=pk)
+    if not request.user.is_staff:
+        posts = posts.filter(author=request.user)  # Mesma regra de PostDetailView.get_object
+    row = (
+        posts.annotate(
+            last_comment_id=Max('comments__id'),
+            last_comment_at=Max('comments__created_at'),
+            liked=Exists(Like.objects.filter(post=OuterRef('pk'), user=request.user)),
+        )
+        .values(
+            'updated_at', 'likes_count', 'comments_count', 'last_comment_id', 'last_comment_at', 'liked',
+            'author__profile__photo',
+        )
+        .first()
+    )
+    if row is None:
+        return None, None
+    # A versão do cache do post pega o que os agregados não veem, como a edição de um comentário
+    return _etag(request.user.pk, blog_cache.post_version(pk), *row.values()), None
+
+
+def profile_validators(request, pk, **kwargs):
+    """Perfil: os próprios campos exibidos (sem data de alteração no modelo, não há Last-Modified)."""
+    profiles = Profile.objects.filter(pk=pk)
+    if not request.user.is_staff:
+        profiles = profiles.filter(user=request.user)  # Mesma regra de ProfileDetailView.get_object
+    row = profiles.values('user_id', 'photo', 'photo_variants', 'bio').first()
+    if row is None:
+        return None, None
+    return _etag(*row.values()), None
@@ -0,0 +1,73 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from BlogApp import timeline
+from BlogApp.timeline import _before
+
+
+class KeysetPagination(BasePagination):
+    """Paginação por keyset em (created_at, id), do mais recente para o mais antigo.
+
+    O cursor é o de BlogApp.timeline (created_at e id do último item da página), e a página
+    seguinte é só um WHERE (created_at, id) < cursor sobre o índice, sem OFFSET mesmo com muitos
+    itens no mesmo instante (importações em massa). As peças são usadas também pela view
+    assíncrona do feed, para que os links 'next' valham nas duas.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, params):
+        # Como o DRF: inteiro positivo limitado a max_page_size; qualquer outro valor usa o tamanho padrão
+        try:
+            page_size = int(params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_cursor(self, params):
+        """(created_at, id) do cursor da query string, ou None. Levanta ValueError se for inválido."""
+        cursor = params.get(self.cursor_query_param)
+        return timeline.decode_cursor(cursor) if cursor else None
+
+    @staticmethod
+    def order(queryset, cursor):
+        queryset = queryset.order_by('-created_at', '-id')
+        return queryset.filter(_before('created_at', 'id', cursor)) if cursor is not None else queryset
+
+    def next_link(self, request, rows, page_size):
+        """Corta rows (page_size + 1 itens) na página e retorna (página, link da seguinte ou None)."""
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        last = rows[-1]
+        created_at, pk = (last['created_at'], last['id']) if isinstance(last, dict) else (last.created_at, last.pk)
+        url = replace_query_param(request.build_absolute_uri(), self.cursor_query_param, timeline.encode_cursor(created_at, pk))
+        return rows, url
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        try:
+            cursor = self.get_cursor(params)
+        except ValueError:
+            raise ParseError("Cursor inválido.")
+        page_size = self.get_page_size(params)
+        rows = list(self.order(queryset, cursor)[:page_size + 1])  # Um a mais só para saber se há outra página
+        page, self.next = self.next_link(request, rows, page_size)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next, 'previous': None, 'results': data})
+
+
+# Paginação do feed de posts
+class FeedCursorPagination(KeysetPagination):
+    pass
+
+
+# Paginação dos comentários de um post: o mesmo keyset de PostView.load_post, sobre o índice comment_post_created_idx
+class CommentCursorPagination(KeysetPagination):
+    pass
@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from BlogApp import images
+from BlogApp.models import COMMENTS_PREVIEW_SIZE, Comment, Post, Profile
+
+# Colunas lidas por post e por comentário: só o que PostSerializer exibe, sem montar instâncias
+POST_FIELDS = (
+    'id', 'title', 'subscription', 'photo_post', 'photo_post_variants', 'author_id', 'author__username',
+    'author__profile__photo', 'created_at', 'updated_at', 'likes_count', 'comments_count',
+)
+COMMENT_FIELDS = ('id', 'author__username', 'post_id', 'content', 'created_at')
+
+_datetime = serializers.DateTimeField()  # Mesmo formato de data das respostas da API
+
+
+class MediaUrls:
+    """URLs absolutas dos arquivos de um storage, com a base resolvida uma vez só.
+
+    storage.url() e request.build_absolute_uri() são chamados para a base (MEDIA_URL ou a URL
+    pública do bucket); o resto da URL é o nome do arquivo, como nas próprias implementações.
+    Tem a mesma interface url(name) de um storage, para images.srcset().
+    """
+
+    def __init__(self, storage, request=None):
+        base = storage.url('')
+        self.base = request.build_absolute_uri(base) if request is not None else base
+
+    def url(self, name):
+        return self.base + filepath_to_uri(name).lstrip('/')
+
+
+def post_rows(queryset):
+    """Posts de queryset como dicionários com as colunas de POST_FIELDS (autor e perfil no mesmo JOIN)."""
+    return queryset.values(*POST_FIELDS)
+
+
+def comment_rows(post_ids):
+    """Os COMMENTS_PREVIEW_SIZE comentários mais recentes de cada post, em uma query com ROW_NUMBER()."""
+    return (
+        Comment.objects.filter(post_id__in=post_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('post_id'), order_by=(F('created_at').desc(), F('id').desc())))
+        .filter(rank__lte=COMMENTS_PREVIEW_SIZE)
+        .order_by('-created_at', '-id')
+        .values(*COMMENT_FIELDS)
+    )
+
+
+def serialize_posts(posts, comments, request=None, liked_post_ids=()):
+    """Monta a saída de PostSerializer(many=True) a partir de post_rows() e comment_rows().
+
+    Mesmas chaves, na mesma ordem, e mesmos valores: o JSON renderizado é idêntico byte a byte
+    (ver PostProjectionTests). Sem liked_post_ids, 'liked' sai False e a view preenche depois.
+    """
+    post_urls = MediaUrls(Post._meta.get_field('photo_post').storage, request)
+    photo_urls = MediaUrls(Profile._meta.get_field('photo').storage, request)
+    previews = defaultdict(list)
+    for comment in comments:
+        previews[comment['post_id']].append({
+            'id': comment['id'],
+            'author': comment['author__username'],
+            'post': comment['post_id'],
+            'content': comment['content'],
+            'created_at': _datetime.to_representation(comment['created_at']),
+        })
+    return [
+        {
+            'id': post['id'],
+            'title': post['title'],
+            'subscription': post['subscription'],
+            'photo_post': post_urls.url(post['photo_post']) if post['photo_post'] else None,
+            'author': post['author__username'],
+            'created_at': _datetime.to_representation(post['created_at']),
+            'updated_at': _datetime.to_representation(post['updated_at']),
+            'likes_count': post['likes_count'],
+            'comments_count': post['comments_count'],
+            'comments': previews.get(post['id'], []),
+            'author_id': post['author_id'],
+            'author_photo': photo_urls.url(post['author__profile__photo']) if post['author__profile__photo'] else None,
+            'liked': post['id'] in liked_post_ids,
+            'photo_post_srcset': images.srcset(post_urls, post['photo_post_variants']),
+        }
+        for post in posts
+    ]
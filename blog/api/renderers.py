@@ -0,0 +1,63 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+# Datas e dataclasses vão para o encoder do DRF, que as formata como o JSONRenderer
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+_encoder = encoders.JSONEncoder()
+
+
+def has_float(data):
+    """Se há algum float em data (dicts, listas e tuplas aninhados), sem recursão."""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is str or kind is int or kind is bool or item is None:
+            continue
+        if kind is dict:
+            stack.extend(item.values())
+        elif kind is list:
+            stack.extend(item)
+        elif isinstance(item, float):
+            return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+def _default(obj):
+    value = _encoder.default(obj)
+    if has_float(value):
+        raise TypeError("float")  # Decimal vira float no encoder do DRF: o JSONRenderer o formata
+    return value
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer com o orjson: os mesmos bytes do JSON compacto do DRF, gerados em C.
+
+    Tipos que o orjson não conhece (datas, Decimal, textos traduzíveis…) passam pelo
+    JSONEncoder do DRF. Volta para o JSONRenderer quando pedem indentação (API navegável,
+    Accept com indent), quando o orjson recusa um valor (inteiro além de 64 bits) e quando há
+    floats: o orjson os escreve de outro jeito (1e-05 sai 0.00001) e troca NaN e Infinity por
+    null em vez de recusá-los, como o STRICT_JSON do DRF. As respostas do feed só têm textos e
+    inteiros, e a conferência dos floats custa menos que a diferença entre os dois renderers.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            self.ensure_ascii or not self.compact or has_float(data)
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Como o JSONRenderer: U+2028 e U+2029 escapados, para o JSON ser JavaScript válido
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
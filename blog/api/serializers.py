@@ -1,13 +1,31 @@
 from rest_framework import serializers
-from BlogApp.models import Post, Follow, Comment, Profile
+from BlogApp.models import Post, Follow, Comment, Profile, Like
 from django.contrib.auth.models import User
+from BlogApp import images
+
+
+# Srcset Field
+class SrcsetField(serializers.Field):
+    """Serializa {formato: srcset} das miniaturas de uma imagem, com URLs absolutas."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, field_file):
+        variants = getattr(field_file.instance, self.source_attrs[-1] + '_variants')
+        request = self.context.get('request')
+        return images.srcset(field_file.storage, variants, request.build_absolute_uri if request else None)
+
 
 #  Profile Serializer
 class ProfileSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source='user.username')
+    photo_srcset = SrcsetField(source='photo')
+
     class Meta:
         model = Profile
-        fields = ['id', 'user', 'photo', 'bio']
+        fields = ['id', 'user', 'photo', 'photo_srcset', 'bio']
         read_only_fields = ['user']
 
 # Comment Serializer
@@ -20,17 +38,43 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'author', 'post', 'content', 'created_at']
         read_only_fields = ['created_at']
 
+# Post List Serializer
+class PostListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Uma única query post_id IN (...) responde "curti estes posts?" para a página inteira
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        # As views assíncronas já passam o conjunto, buscado junto com os posts
+        if request is not None and 'liked_post_ids' not in self.context:
+            self.context['liked_post_ids'] = Like.liked_post_ids(request.user, [post.pk for post in posts])
+        return super().to_representation(posts)
+
+
 # Post Serializer
 class PostSerializer(serializers.ModelSerializer):
-    comments = CommentSerializer(many=True, read_only=True)  # Comentários do post
+    comments = CommentSerializer(many=True, read_only=True, source='comments_preview')  # Comentários mais recentes do post
     author_photo = serializers.ImageField(source='author.profile.photo', read_only=True)  # Acessa a foto através do profile do autor
     author = serializers.StringRelatedField() 
     author_id = serializers.IntegerField()
     likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)  # Total de comentários; 'comments' traz só os mais recentes
       # Contagem de likes
+    liked = serializers.SerializerMethodField()  # Se o usuário autenticado curtiu o post
+    photo_post_srcset = SrcsetField(source='photo_post')  # Miniaturas em WebP/JPEG por largura
+
     class Meta:
         model = Post
-        fields = ['id', 'title', 'subscription', 'photo_post', 'author', 'created_at', 'updated_at', 'likes_count', 'comments', 'author_id', 'author_photo']
+        fields = ['id', 'title', 'subscription', 'photo_post', 'author', 'created_at', 'updated_at', 'likes_count', 'comments_count', 'comments', 'author_id', 'author_photo', 'liked', 'photo_post_srcset']
+        list_serializer_class = PostListSerializer
+
+    def get_liked(self, obj):
+        liked_post_ids = self.context.get('liked_post_ids')
+        if liked_post_ids is None:
+            request = self.context.get('request')
+            if request is None:
+                return False
+            liked_post_ids = Like.liked_post_ids(request.user, [obj.pk])
+        return obj.pk in liked_post_ids
 
 
 
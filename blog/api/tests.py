@@ -1,3 +1,600 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.async_views import AsyncFeedView, AsyncPostDetailView, AsyncProfileDetailView
+from api.authentication import CachedTokenAuthentication, issue_token
+from api.projections import comment_rows, post_rows, serialize_posts
+from api.renderers import ORJSONRenderer
+from api.serializers import PostSerializer
+from api.urls import read_route
+from api.views import PostDetailView
+from BlogApp import realtime
+from BlogApp.models import Post, Comment, Profile, Follow, Like
+
+# Rotas de leitura da API como ficam com ASYNC_API_ROUTES preenchido (ver AsyncReadViewTests)
+urlpatterns = [
+    path('api/posts/', AsyncFeedView.as_view(), name='api_post_list_create'),
+    path('api/posts/<int:pk>/', AsyncPostDetailView.as_view(), name='api_post_detail'),
+    path('api/profile/<int:pk>/', AsyncProfileDetailView.as_view(), name='profile_detail'),
+]
+
+
+class PostFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor', password='senha123')
+        self.client.force_authenticate(self.user)
+
+    def create_posts(self, total):
+        for i in range(total):
+            author = User.objects.create_user(username=f'autor{Post.objects.count()}')
+            Profile.objects.create(user=author)
+            post = Post.objects.create(title=f'Post {i}', subscription='...', author=author)
+            post.toggle_like(self.user)
+            for j in range(4):
+                Comment.objects.create(post=post, author=self.user, content=f'Comentário {j}')
+
+    def feed_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api_post_list_create'), {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx)
+
+    def test_feed_query_count_does_not_grow_with_page_size(self):
+        self.create_posts(25)
+        # Se algum campo do serializer fizer uma query por linha, as contagens divergem
+        self.assertEqual(self.feed_queries(5), self.feed_queries(25))
+
+    def test_feed_payload(self):
+        self.create_posts(1)
+        post = self.client.get(reverse('api_post_list_create')).data['results'][0]
+        self.assertEqual(post['likes_count'], 1)
+        self.assertTrue(post['liked'])
+        self.assertEqual(len(post['comments']), 3)
+        self.assertEqual(post['comments'][0]['content'], 'Comentário 3')
+
+    def test_cursor_walks_every_post_once(self):
+        self.create_posts(7)
+        url = reverse('api_post_list_create') + '?page_size=3'
+        seen = []
+        while url:
+            data = self.client.get(url).data
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(seen, list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_cursor_with_equal_timestamps(self):
+        # Importação em massa: todos os posts no mesmo instante, e o cursor desempata pelo id
+        self.create_posts(5)
+        Post.objects.update(created_at=timezone.now())
+        url = reverse('api_post_list_create') + '?page_size=2'
+        seen = []
+        while url:
+            data = self.client.get(url).data
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(seen, list(Post.objects.order_by('-id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get(reverse('api_post_list_create'), {'cursor': 'x'}).status_code, 400)
+
+
+class PostProjectionTests(APITestCase):
+    """O caminho rápido do feed (values() + orjson) tem de gerar os mesmos bytes de PostSerializer + JSONRenderer."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor')
+        with_photo = User.objects.create_user(username='fotógrafo')
+        # Nomes gravados direto no banco: o arquivo não precisa existir para montar a URL
+        Profile.objects.filter(pk=Profile.objects.create(user=with_photo).pk).update(photo='profile_photos/eu e você.png')
+        without_photo = User.objects.create_user(username='semfoto')
+        Profile.objects.create(user=without_photo)
+        without_profile = User.objects.create_user(username='semperfil')
+
+        tricky = 'ção 😀 \u2028\u2029 "aspas" \\ </script>\x01\t\n'
+        post = Post.objects.create(title='Unicode ✓', subscription=tricky, author=with_photo)
+        Post.objects.filter(pk=post.pk).update(photo_post='blobs/ab/cd/abcd.png', photo_post_variants={
+            'source': 'blobs/ab/cd/abcd.png',
+            'webp': {'640': 'blobs/11/22/1122.webp', '320': 'blobs/33/44/3344.webp'},
+            'jpg': {'320': 'blobs/55/66/5566.jpg'},
+        })
+        moment = timezone.now()
+        for i in range(5):
+            # Mesmo instante em todos: a ordem da prévia sai do id, como no Prefetch de for_feed()
+            comment = Comment.objects.create(post=post, author=without_profile, content=f'{tricky} {i}')
+            Comment.objects.filter(pk=comment.pk).update(created_at=moment)
+        post.toggle_like(self.user)
+        Post.objects.create(title='Sem foto', subscription='...', author=without_photo)
+        post = Post.objects.create(title='Sem perfil', subscription='', author=without_profile)
+        Post.objects.filter(pk=post.pk).update(photo_post='img/foto 1.png')
+
+        self.request = APIRequestFactory().get('/api/posts/')
+        self.request.user = self.user
+
+    def test_output_matches_post_serializer(self):
+        queryset = Post.objects.order_by('-created_at', '-id')
+        liked = Like.liked_post_ids(self.user, queryset.values('id'))
+        expected = JSONRenderer().render(PostSerializer(
+            queryset.for_feed(), many=True, context={'request': self.request, 'liked_post_ids': liked},
+        ).data)
+        posts = list(post_rows(queryset))
+        actual = ORJSONRenderer().render(
+            serialize_posts(posts, comment_rows([post['id'] for post in posts]), self.request, liked),
+        )
+        self.assertEqual(actual, expected)
+        self.assertIn(b'\\u2028', actual)
+        self.assertIn('http://testserver/media/profile_photos/eu%20e%20voc%C3%AA.png'.encode(), actual)
+
+    def test_renderer_falls_back_to_drf_encoding(self):
+        data = {'quando': timezone.now(), 'valor': Decimal('0.00001'), 'texto': gettext_lazy('Texto'), 1: [2 ** 70]}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+        # Floats são formatados pelo JSONRenderer; NaN e Infinity continuam recusados (STRICT_JSON)
+        floats = {'results': [{'nota': 1e-05}, {'nota': 1e16}, (0.1, 2.5)]}
+        self.assertEqual(ORJSONRenderer().render(floats), JSONRenderer().render(floats))
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render({'results': [{'nota': value}]})
+
+
+class FeedCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(title='Post', subscription='...', author=self.user)
+
+    def test_feed_page_is_served_from_cache(self):
+        url = reverse('api_post_list_create')
+        self.client.get(url)
+        # Na segunda vez só restam o agregado do ETag e a consulta de "curti estes posts?"
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['id'], self.post.id)
+        self.assertEqual(self.client.get(reverse('api_cache_stats')).status_code, 403)
+
+    def test_comment_invalidates_feed_page(self):
+        url = reverse('api_post_list_create')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('api_create_comment', args=[self.post.id]), {'content': 'Novo'})
+        comments = self.client.get(url).data['results'][0]['comments']
+        self.assertEqual([comment['content'] for comment in comments], ['Novo'])
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        self.profile = Profile.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(title='Post', subscription='...', author=self.user)
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        return self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('api_post_list_create')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            # Só o agregado: nem a página nem os likes são consultados
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_like_changes_feed_etag(self):
+        url = reverse('api_post_list_create')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.toggle_like(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['liked'])
+
+    def test_post_detail_validators(self):
+        url = reverse('api_post_detail', args=[self.post.id])
+        self.assertEqual(self.revalidate(url).status_code, 304)
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        Comment.objects.create(post=self.post, author=self.user, content='Oi')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_like_is_not_hidden_by_if_modified_since(self):
+        # Likes não mudam updated_at: revalidar por data serviria contagens antigas
+        url = reverse('api_post_list_create')
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        since = http_date(timezone.now().timestamp() + 3600)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.toggle_like(self.user)
+        for url in (url, reverse('api_post_detail', args=[self.post.id])):
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_post_detail_keeps_permissions(self):
+        other = User.objects.create_user(username='outro')
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse('api_post_detail', args=[self.post.id]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 403)
+
+    def test_profile_detail_validators(self):
+        url = f'/api/profile/{self.profile.id}/'  # O nome profile_detail também existe em BlogApp.urls
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Profile.objects.filter(pk=self.profile.pk).update(bio='Nova bio')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TimelineApiTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor')
+        self.author = User.objects.create_user(username='autor')
+        Profile.objects.create(user=self.user)
+        Profile.objects.create(user=self.author)
+        Follow.toggle(self.user, self.author)
+
+    def test_created_post_reaches_follower_timeline(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(
+            reverse('api_post_list_create'),
+            {'title': 'Novo', 'subscription': '...', 'author_id': self.author.id},
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.client.force_authenticate(self.user)
+        data = self.client.get(reverse('api_timeline')).data
+        self.assertEqual([post['title'] for post in data['results']], ['Novo'])
+        self.assertEqual(self.client.get(reverse('api_timeline'), {'cursor': 'x'}).status_code, 400)
+
+
+class ExportApiTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', is_staff=True)
+        author = User.objects.create_user(username='autor')
+        Post.objects.create(title='Post', subscription='...', author=author)
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(User.objects.create_user(username='comum'))
+        self.assertEqual(self.client.get(reverse('api_export')).status_code, 403)
+
+    def test_streams_ndjson(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('api_export'), {'types': 'posts'})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['type'] for row in rows], ['post', 'watermark'])
+
+    def test_gzip_when_accepted(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('api_export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(json.loads(lines[-1])['type'], 'watermark')
+
+    def test_invalid_types(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(reverse('api_export'), {'types': 'senhas'}).status_code, 400)
+
+
+class SearchApiTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor')
+        self.client.force_authenticate(self.user)
+
+    def test_search_pages(self):
+        for i in range(3):
+            Post.objects.create(title=f'Corrida {i}', subscription='...', author=self.user)
+        response = self.client.get(reverse('api_search'), {'q': 'corrida'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNone(response.data['next'])
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get(reverse('api_search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_search'), {'q': 'x', 'cursor': '!!'}).status_code, 400)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor', password='senha123')
+        token = self.client.post(reverse('api_token_login'), {'username': 'leitor', 'password': 'senha123'}).data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token}')
+
+    def test_second_lookup_skips_database(self):
+        self.assertEqual(CachedTokenAuthentication().authenticate(self.request)[0], self.user)
+        with self.assertNumQueries(0):
+            user, token = CachedTokenAuthentication().authenticate(self.request)
+        self.assertEqual((user, token.user), (self.user, self.user))
+
+    def test_logout_invalidates_cached_token(self):
+        self.assertEqual(self.client.get(reverse('api_timeline')).status_code, 200)
+        self.assertEqual(self.client.post(reverse('api_logout')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('api_timeline')).status_code, 401)
+
+    def test_rotation_invalidates_previous_token(self):
+        self.client.get(reverse('api_timeline'))
+        new_token = self.client.post(reverse('api_token_rotate')).data['token']
+        self.assertEqual(self.client.get(reverse('api_timeline')).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new_token}')
+        self.assertEqual(self.client.get(reverse('api_timeline')).status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('api_timeline'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('api_timeline')).status_code, 401)
+
+    @override_settings(API_TOKEN_TTL=60)
+    def test_expired_token(self):
+        self.client.get(reverse('api_timeline'))
+        Token.objects.update(created=timezone.now() - timedelta(minutes=5))
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('api_timeline')).status_code, 401)
+        self.assertFalse(Token.objects.exists())
+        # Um novo login emite outro token
+        self.client.credentials()
+        response = self.client.post(reverse('api_token_login'), {'username': 'leitor', 'password': 'senha123'})
+        self.assertEqual(response.status_code, 200)
+
+
+    @override_settings(API_TOKEN_TTL=60)
+    def test_async_path_applies_the_same_checks(self):
+        authenticate = async_to_sync(CachedTokenAuthentication().aauthenticate)
+        self.assertEqual(authenticate(self.request)[0], self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, "Usuário inativo ou excluído."):
+            authenticate(self.request)
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        Token.objects.update(created=timezone.now() - timedelta(minutes=5))
+        cache.clear()
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, "Token expirado."):
+            authenticate(self.request)
+        self.assertFalse(Token.objects.exists())
+
+@override_settings(LOGIN_MAX_FAILURES_PER_ACCOUNT=2)
+class TokenLoginThrottleTests(APITestCase):
+    def test_repeated_failures_get_429(self):
+        cache.clear()
+        User.objects.create_user(username='ana', password='senha123')
+        for _ in range(2):
+            response = self.client.post(reverse('api_token_login'), {'username': 'ana', 'password': 'errada'})
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse('api_token_login'), {'username': 'ana', 'password': 'senha123'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '300')
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        self.profile = Profile.objects.create(user=self.user)
+        self.auth = {'Authorization': f'Token {issue_token(self.user).key}'}
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            author = User.objects.create_user(username=f'autor{i}')
+            Profile.objects.create(user=author)
+            post = Post.objects.create(title=f'Post {i}', subscription='...', author=author)
+            Comment.objects.create(post=post, author=self.user, content=f'Comentário {i}')
+            if i % 2:
+                post.toggle_like(self.user)
+        self.post = Post.objects.create(title='Meu post', subscription='...', author=self.user)
+
+    async def aget(self, url, **headers):
+        with override_settings(ROOT_URLCONF='api.tests'):
+            return await self.async_client.get(url, headers={**self.auth, **headers})
+
+    async def test_feed_matches_sync_view(self):
+        expected = (await sync_to_async(self.client.get)('/api/posts/')).json()['results']
+        await sync_to_async(cache.clear)()  # As duas rotas dividem o cache: a página é montada de novo aqui
+        response = await self.aget('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], expected)
+        self.assertEqual([post['liked'] for post in expected].count(True), 2)
+        # Token, validadores, página e 'curti' (em paralelo) e prévia dos comentários
+        self.assertIn('desc="5 queries"', response['Server-Timing'])
+
+    async def test_feed_pagination(self):
+        url, ids = '/api/posts/?page_size=2', []
+        while url:
+            data = (await self.aget(url)).json()
+            ids += [post['id'] for post in data['results']]
+            url = data['next']
+        expected = await sync_to_async(list)(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual((await self.aget('/api/posts/?cursor=x')).status_code, 400)
+        for page_size in ('0', '-1', 'x'):
+            # Tamanho inválido: página do tamanho padrão, como na view síncrona
+            response = await self.aget(f'/api/posts/?page_size={page_size}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), len(expected))
+
+    async def test_sync_cursor_works_on_async_route(self):
+        await Post.objects.aupdate(created_at=timezone.now())
+        expected = await sync_to_async(list)(Post.objects.order_by('-id').values_list('id', flat=True))
+        first = (await sync_to_async(self.client.get)('/api/posts/?page_size=2')).json()
+        ids = [post['id'] for post in first['results']]
+        url = first['next']
+        while url:
+            data = (await self.aget(url)).json()
+            ids += [post['id'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(ids, expected)
+
+    async def test_post_detail_and_profile(self):
+        response = await self.aget(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response.json()['title'], 'Meu post')
+        self.assertEqual((await self.aget(f'/api/posts/{self.post.id}/', **{'If-None-Match': response['ETag']})).status_code, 304)
+        other = await Post.objects.exclude(author=self.user).afirst()
+        self.assertEqual((await self.aget(f'/api/posts/{other.id}/')).status_code, 403)
+        self.assertEqual((await self.aget('/api/posts/999999/')).status_code, 404)
+        response = await self.aget(f'/api/profile/{self.profile.id}/')
+        self.assertEqual(response.json()['user'], 'leitor')
+
+    async def test_requires_token(self):
+        with override_settings(ROOT_URLCONF='api.tests'):
+            self.assertEqual((await self.async_client.get('/api/posts/')).status_code, 401)
+            response = await self.async_client.get('/api/posts/', headers={'Authorization': 'Token invalido'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_writes_go_to_sync_view(self):
+        with override_settings(ROOT_URLCONF='api.tests'):
+            response = await self.async_client.patch(
+                f'/api/posts/{self.post.id}/', {'title': 'Editado'}, content_type='application/json', headers=self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+        await self.post.arefresh_from_db()
+        self.assertEqual(self.post.title, 'Editado')
+
+    def test_route_selection(self):
+        self.assertIs(read_route('posts/<int:pk>/', PostDetailView, AsyncPostDetailView, 'api_post_detail').callback.view_class, PostDetailView)
+        with override_settings(ASYNC_API_ROUTES=['api_post_detail']):
+            route = read_route('posts/<int:pk>/', PostDetailView, AsyncPostDetailView, 'api_post_detail')
+        self.assertIs(route.callback.view_class, AsyncPostDetailView)
+
+
+class EventStreamTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leitor')
+        self.author = User.objects.create_user(username='autor')
+        Profile.objects.create(user=self.user)
+        Profile.objects.create(user=self.author)
+        self.post = Post.objects.create(title='Post', subscription='...', author=self.author)
+        self.auth = {'Authorization': f'Token {issue_token(self.user).key}'}
+
+    async def open(self, topics):
+        response = await self.async_client.get('/api/events/', {'topics': topics}, headers=self.auth)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 3000\n\n')
+        return events
+
+    async def next_event(self, events):
+        chunk = (await asyncio.wait_for(anext(events), 1)).decode()
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        return fields['event'], json.loads(fields['data'])
+
+    async def disconnect(self, events):
+        # Como o handler ASGI quando o cliente cai: cancela a leitura pendente do stream
+        pending = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+    def write(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    async def test_like_comment_and_follow_are_pushed(self):
+        events = await self.open(f'post:{self.post.id},user:{self.author.id}')
+        await sync_to_async(self.write)(lambda: self.post.toggle_like(self.user))
+        self.assertEqual(await self.next_event(events), ('like', {
+            'post_id': self.post.id, 'user_id': self.user.id, 'liked': True, 'likes_count': 1,
+        }))
+        # Publicado nos dois tópicos com o mesmo id: a conexão recebe as duas cópias e descarta uma
+        self.assertEqual((await self.next_event(events))[0], 'like')
+
+        await sync_to_async(self.write)(lambda: Comment.objects.create(post=self.post, author=self.user, content='Oi'))
+        event, data = await self.next_event(events)
+        self.assertEqual((event, data['content'], data['author']), ('comment', 'Oi', 'leitor'))
+        await self.next_event(events)
+
+        await sync_to_async(self.write)(lambda: Follow.toggle(self.user, self.author))
+        event, data = await self.next_event(events)
+        self.assertEqual((event, data['following'], data['followers_count']), ('follow', True, 1))
+
+        await self.disconnect(events)
+        self.assertEqual(dict(realtime.broker().topics), {})
+
+    async def test_rolled_back_write_is_not_published(self):
+        events = await self.open(f'post:{self.post.id}')
+        await sync_to_async(self.post.toggle_like)(self.user)  # O commit nunca acontece no TestCase
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.next_event(events)
+        # A espera cancelada fecha o stream, como uma desconexão
+        self.assertNotIn(f'post:{self.post.id}', realtime.broker().topics)
+
+    async def test_invalid_topics_and_auth(self):
+        response = await self.async_client.get('/api/events/', {'topics': 'admin:1'}, headers=self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.async_client.get('/api/events/')).status_code, 401)
+
+    def test_requires_asgi(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/events/').status_code, 501)
+
+
+class CommentListApiTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='leitor')
+        Profile.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(title='Post', subscription='...', author=self.user)
+        for i in range(5):
+            Comment.objects.create(post=self.post, author=self.user, content=f'Comentário {i}')
+
+    def test_cursor_pagination(self):
+        url, contents = reverse('api_create_comment', args=[self.post.id]) + '?page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            contents += [comment['content'] for comment in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(contents, [f'Comentário {i}' for i in range(4, -1, -1)])
+        self.assertEqual(self.client.get(reverse('api_create_comment', args=[999999])).status_code, 404)
+
+    def test_cursor_with_equal_timestamps(self):
+        # Mesmo keyset (created_at, id) de PostView.load_post: o id desempata comentários do mesmo instante
+        Comment.objects.update(created_at=timezone.now())
+        url, ids = reverse('api_create_comment', args=[self.post.id]) + '?page_size=2', []
+        while url:
+            data = self.client.get(url).data
+            ids += [comment['id'] for comment in data['results']]
+            url = data['next']
+        self.assertEqual(ids, list(self.post.comments.order_by('-id').values_list('id', flat=True)))
+        response = self.client.get(reverse('api_create_comment', args=[self.post.id]), {'cursor': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_payload_has_count_and_latest_comments(self):
+        data = self.client.get(reverse('api_post_list_create')).data['results'][0]
+        self.assertEqual(data['comments_count'], 5)
+        self.assertEqual([comment['content'] for comment in data['comments']], ['Comentário 4', 'Comentário 3', 'Comentário 2'])
+
+    def test_create_and_delete_update_count(self):
+        response = self.client.post(reverse('api_create_comment', args=[self.post.id]), {'content': 'Novo'})
+        self.assertEqual(response.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 6)
+
+        response = self.client.delete(reverse('api_comment_detail', args=[response.data['id']]))
+        self.assertEqual(response.status_code, 204)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
@@ -1,20 +1,29 @@
+from django.conf import settings
 from django.urls import path
-from .views import CommentCreateView, LoginView, PostListCreateView, PostDetailView, FollowUserView, CommentDetailView, ProfileCreateView, ProfileDetailView, LikePostView
+from .async_views import AsyncFeedView, AsyncPostDetailView, AsyncProfileDetailView, EventStreamView
+from .views import CommentCreateView, LoginView, LogoutView, TokenRotateView, PostListCreateView, PostDetailView, FollowUserView, CommentDetailView, ProfileCreateView, ProfileDetailView, LikePostView, CacheStatsView, TimelineView, ExportView, SearchView
 
 
 
+def read_route(route, view, async_view, name):
+    """Rota com GET assíncrono (async_view) se name estiver em ASYNC_API_ROUTES; senão, a view DRF."""
+    return path(route, (async_view if name in settings.ASYNC_API_ROUTES else view).as_view(), name=name)
+
+
 urlpatterns = [
     # Post URLs
-    path('posts/', PostListCreateView.as_view(), name='api_post_list_create'),  # Listar e criar posts
-    path('posts/<int:pk>/', PostDetailView.as_view(), name='api_post_detail'),  # Detalhar, atualizar e excluir posts
+    read_route('posts/', PostListCreateView, AsyncFeedView, 'api_post_list_create'),  # Listar e criar posts
+    path('timeline/', TimelineView.as_view(), name='api_timeline'),  # Timeline de quem o usuário segue
+    path('search/', SearchView.as_view(), name='api_search'),  # Busca em posts e comentários
+    read_route('posts/<int:pk>/', PostDetailView, AsyncPostDetailView, 'api_post_detail'),  # Detalhar, atualizar e excluir posts
     path('posts/<int:pk>/like/', LikePostView.as_view(), name='api_post_like'),
     path('profile/', ProfileCreateView.as_view(), name='create_profile'),  # Criação de perfil para o usuário autenticado
-    path('profile/<int:pk>/', ProfileDetailView.as_view(), name='profile_detail'),
+    read_route('profile/<int:pk>/', ProfileDetailView, AsyncProfileDetailView, 'profile_detail'),
     # Follow URLs
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='api_follow_user'),  # Seguir e deixar de seguir usuários
 
     # Comment URLs
-    path('posts/<int:post_id>/comments/', CommentCreateView.as_view(), name='api_create_comment'),  # Criar comentário em um post
+    path('posts/<int:post_id>/comments/', CommentCreateView.as_view(), name='api_create_comment'),  # Listar (por cursor) e criar comentários de um post
     path('comments/<int:pk>/', CommentDetailView.as_view(), name='api_comment_detail'),  # Detalhar, atualizar e excluir comentários
 
     # Profile URLs
@@ -23,4 +32,15 @@ urlpatterns = [
 
     #TOKEN LOGIN
     path('token/', LoginView.as_view(), name='api_token_login'),
+    path('token/rotate/', TokenRotateView.as_view(), name='api_token_rotate'),
+    path('logout/', LogoutView.as_view(), name='api_logout'),
+
+    # Cache
+    path('cache/stats/', CacheStatsView.as_view(), name='api_cache_stats'),
+
+    # Eventos em tempo real (Server-Sent Events, só em ASGI)
+    path('events/', EventStreamView.as_view(), name='api_events'),
+
+    # Exportação
+    path('export/', ExportView.as_view(), name='api_export'),
 ] 
@@ -1,30 +1,38 @@
+from urllib.parse import urlencode
+
 from rest_framework import viewsets, generics, permissions, status
-from rest_framework.authentication import TokenAuthentication
-from BlogApp.models import Post, Follow, Comment, Profile
+from BlogApp.models import Post, Follow, Comment, Profile, Like
+from BlogApp import cache as blog_cache
+from BlogApp import export, jobs, search, timeline
+from BlogApp.auth import LoginThrottled, login_attempt
 from .serializers import LoginSerializer, PostSerializer, FollowSerializer, CommentSerializer, ProfileSerializer
+from .authentication import CachedTokenAuthentication, issue_token, rotate_token
+from .conditional import conditional, feed_validators, post_validators, profile_validators
+from .pagination import CommentCursorPagination, FeedCursorPagination
+from . import projections
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth.models import User
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
 
 
 # Home View
-class HomeView(APIView):
+class HomeView(generics.ListAPIView):
+    queryset = Post.objects.for_feed()
+    serializer_class = PostSerializer
+    pagination_class = FeedCursorPagination
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         """
-        Returns the list of posts with their comments.
+        Returns a page of posts with a preview of their comments.
         """
         user_profile, _ = Profile.objects.get_or_create(user=self.request.user)
-        posts = Post.objects.all()  # You can filter posts if necessary
-        serializer = PostSerializer(posts, many=True)
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return super().get(request, *args, **kwargs)
 
 
 
@@ -40,20 +48,52 @@ class LoginView(APIView):
         if not username or not password:
             return Response({"error": "Usuário e senha são obrigatórios"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Autentica o usuário
-        user = authenticate(username=username, password=password)
+        # Autentica o usuário; com falhas demais do IP ou da conta, recusa antes de calcular o hash
+        try:
+            user = login_attempt(request, password, username=username)
+        except LoginThrottled as throttled:
+            return Response(
+                {"error": "Muitas tentativas de login. Tente novamente mais tarde."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(throttled.retry_after)},
+            )
 
         if user:
-            # Se o usuário existe, gera um token
-            token, created = Token.objects.get_or_create(user=user)
+            # Se o usuário existe, gera um token (ou troca o expirado)
+            token = issue_token(user)
             return Response({"token": token.key}, status=status.HTTP_200_OK)
         else:
             return Response({"error": "Credenciais inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+# Logout View
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Apaga o token do usuário; o cache de autenticação é invalidado junto.
+        """
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# Token Rotate View
+class TokenRotateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Troca o token do usuário por um novo; o anterior deixa de valer na hora.
+        """
+        token = rotate_token(request.user)
+        return Response({"token": token.key}, status=status.HTTP_200_OK)
+
+
 # Like Post View
 class LikePostView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 10
 
     def post(self, request, pk):
         """
@@ -66,25 +106,102 @@ class LikePostView(APIView):
         post.toggle_like(user)
 
         # Retorna a contagem de likes atualizada
-        return Response({"likes_count": post.likes_count()}, status=status.HTTP_200_OK)
+        return Response({"likes_count": post.likes_count}, status=status.HTTP_200_OK)
 
 # Post CRUD
 class PostListCreateView(generics.ListCreateAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.for_feed()
     serializer_class = PostSerializer
-    authentication_classes = [TokenAuthentication]
+    pagination_class = FeedCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 7, 'POST': 16}  # Limite de queries por request (ver BlogApp.instrumentation)
+
+    @conditional(feed_validators)
+    def get(self, request, *args, **kwargs):
+        # ETag antes de montar a página: o app recebe 304 se nada mudou
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # A página serializada vai para o cache; só o campo 'liked' é recalculado por usuário
+        key = blog_cache.feed_key('api', request.get_host(), request.get_full_path())
+        data = blog_cache.cached(key, lambda: self.page_data(request))
+        liked_post_ids = Like.liked_post_ids(request.user, [post['id'] for post in data['results']])
+        for post in data['results']:
+            post['liked'] = post['id'] in liked_post_ids
+        return Response(data)
+
+    def page_data(self, request):
+        # Leitura em dicionários (values()), sem instâncias nem PostSerializer: mesmo JSON, bem mais rápido
+        posts = self.paginate_queryset(projections.post_rows(Post.objects.all()))
+        comments = projections.comment_rows([post['id'] for post in posts])
+        return self.get_paginated_response(projections.serialize_posts(posts, comments, request)).data
 
     def perform_create(self, serializer):
         # Cria o post com o autor sendo o usuário autenticado
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        # Entrega o post nas timelines dos seguidores, fora do request
+        jobs.enqueue('timeline.fan_out', key=f'timeline.fan_out:{post.pk}', post_id=post.pk)
+
+
+# Timeline View
+class TimelineView(APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 8
+
+    def get(self, request):
+        """
+        Retorna uma página da timeline 'seguindo' do usuário autenticado.
+        """
+        cursor = request.query_params.get('cursor')
+        try:
+            cursor = timeline.decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return Response({"error": "Cursor inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        posts, next_cursor = timeline.read_timeline(request.user, cursor)
+        serializer = PostSerializer(posts, many=True, context={'request': request})
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(f"{request.path}?cursor={next_cursor}")
+        return Response({'next': next_url, 'results': serializer.data}, status=status.HTTP_200_OK)
+
+
+# Search View
+class SearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 8
+
+    def get(self, request):
+        """
+        Busca posts por título, descrição e comentários, do mais relevante para o menos relevante.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "Informe o texto da busca em 'q'."}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.query_params.get('cursor')
+        try:
+            cursor = search.decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return Response({"error": "Cursor inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        posts, next_cursor = search.search_posts(text, cursor)
+        serializer = PostSerializer(posts, many=True, context={'request': request})
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(f"{request.path}?{urlencode({'q': text, 'cursor': next_cursor})}")
+        return Response({'next': next_url, 'results': serializer.data}, status=status.HTTP_200_OK)
 
 
 class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.for_feed()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
 
+    @conditional(post_validators)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_object(self):
         post = super().get_object()
         if not (post.author == self.request.user or self.request.user.is_staff):
@@ -95,7 +212,8 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
 # Follow CRUD
 class FollowUserView(APIView):
     permission_classes = [IsAuthenticated]  # Garantir que o usuário esteja logado
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    query_budget = 12
 
     def post(self, request, user_id):
         """
@@ -107,17 +225,8 @@ class FollowUserView(APIView):
         if user_to_follow == request.user:
             return Response({'error': 'Você não pode seguir a si mesmo.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Verifica se já existe um relacionamento de follow
-        follow, created = Follow.objects.get_or_create(follower=request.user, following=user_to_follow)
-
-        if not created:
-            follow.delete()  # Deixar de seguir
-            following = False
-        else:
-            following = True  # Seguir
-
-        # Contagem de seguidores
-        followers_count = Follow.objects.filter(following=user_to_follow).count()
+        # Segue ou deixa de seguir; os contadores são atualizados na mesma transação
+        following, followers_count = Follow.toggle(request.user, user_to_follow)
 
         return Response({
             'following': following,
@@ -128,6 +237,17 @@ class FollowUserView(APIView):
 # Comment CRUD
 class CommentCreateView(APIView):
     permission_classes = [IsAuthenticated]  # Garantir que o usuário esteja logado
+    query_budget = {'GET': 4, 'POST': 8}
+
+    def get(self, request, post_id):
+        """
+        Lista os comentários do post, do mais recente para o mais antigo, paginados por cursor
+        """
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(post.comments.select_related('author'), request, view=self)
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, post_id):
         """
@@ -188,8 +308,52 @@ class ProfileDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
 
+    @conditional(profile_validators)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_object(self):
         profile = super().get_object()
         if profile.user != self.request.user and not self.request.user.is_staff:
             raise PermissionDenied("Você não tem permissão para editar ou excluir este perfil.")
         return profile
+
+
+# Cache Stats View
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Retorna os contadores de acertos e faltas do cache de feed e posts.
+        """
+        return Response(blog_cache.stats(), status=status.HTTP_200_OK)
+
+
+# Export View
+class ExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Exporta posts, comentários, likes e follows em NDJSON, em streaming.
+        Aceita ?types=posts,comments e ?since=<watermark>; comprime em gzip se o cliente aceitar.
+        """
+        types = request.query_params.get('types')
+        types = types.split(',') if types else export.EXPORT_TYPES
+        if any(name not in export.EXPORTS for name in types):
+            return Response({"error": f"Tipos válidos: {', '.join(export.EXPORT_TYPES)}."}, status=status.HTTP_400_BAD_REQUEST)
+        since = request.query_params.get('since')
+        try:
+            watermark = export.decode_watermark(since) if since else None
+        except ValueError:
+            return Response({"error": "Watermark inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks = export.ndjson(export.records(types, watermark))
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = StreamingHttpResponse(export.gzipped(chunks) if use_gzip else chunks, content_type='application/x-ndjson')
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = 'attachment; filename="blog-export.ndjson"'
+        return response
@@ -0,0 +1,68 @@
+"""
+Cenário de carga local contra as rotas de /api/.
+
+Pré-requisitos: banco populado com ``manage.py seed_blog`` e ``pip install locust``.
+
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 \
+        --users 200 --spawn-rate 20 --run-time 2m --headless --json > carga.json
+
+Variáveis de ambiente: BENCH_USERS (quantos usuários do seed usar), BENCH_PREFIX e BENCH_PASSWORD.
+
+WSGI x ASGI (``pip install gunicorn uvicorn``): rode o mesmo cenário contra cada servidor, com o
+mesmo número de processos, e compare as vazões. Em ASGI, ASYNC_API_ROUTES liga as views assíncronas
+das rotas de leitura (ver api.async_views); sem servidor, ``manage.py benchmark_asgi`` compara os handlers.
+
+    gunicorn Blog.wsgi:application --workers 4 --threads 8
+    ASYNC_API_ROUTES=api_post_list_create,api_post_detail,profile_detail \
+        uvicorn Blog.asgi:application --workers 4
+"""
+import os
+import random
+
+from locust import HttpUser, between, task
+
+BENCH_USERS = int(os.environ.get('BENCH_USERS', 1000))
+BENCH_PREFIX = os.environ.get('BENCH_PREFIX', 'bench')
+BENCH_PASSWORD = os.environ.get('BENCH_PASSWORD', 'benchmark')
+
+
+class MobileClient(HttpUser):
+    """Simula o app Expo: lê o feed com frequência e de vez em quando curte, comenta ou segue."""
+
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        username = f'{BENCH_PREFIX}{random.randrange(BENCH_USERS)}'
+        response = self.client.post('/api/token/', json={'username': username, 'password': BENCH_PASSWORD}, name='/api/token/')
+        self.client.headers['Authorization'] = f"Token {response.json()['token']}"
+        self.post_ids = []
+
+    @task(10)
+    def feed(self):
+        response = self.client.get('/api/posts/', name='/api/posts/')
+        data = response.json()
+        self.post_ids = [post['id'] for post in data['results']]
+        if data['next'] and random.random() < 0.3:
+            self.client.get(data['next'], name='/api/posts/?cursor')
+
+    @task(4)
+    def timeline(self):
+        self.client.get('/api/timeline/', name='/api/timeline/')
+
+    @task(3)
+    def like(self):
+        if self.post_ids:
+            self.client.post(f'/api/posts/{random.choice(self.post_ids)}/like/', name='/api/posts/[id]/like/')
+
+    @task(1)
+    def comment(self):
+        if self.post_ids:
+            self.client.post(
+                f'/api/posts/{random.choice(self.post_ids)}/comments/',
+                json={'content': 'Comentário de carga'},
+                name='/api/posts/[id]/comments/',
+            )
+
+    @task(1)
+    def follow(self):
+        self.client.post(f'/api/follow/{random.randrange(1, BENCH_USERS)}/', name='/api/follow/[id]/')
@@ -0,0 +1,50 @@
+"""
+Cenário de credential stuffing contra /api/token/, com clientes legítimos logando ao mesmo tempo.
+
+Mede quantos requests por segundo o servidor aguenta enquanto recusa a rajada (429 sem calcular
+hash) e se os logins legítimos continuam respondendo. Pré-requisitos como em locustfile.py.
+
+    locust -f benchmarks/login_attack.py --host http://127.0.0.1:8000 \
+        --users 300 --spawn-rate 50 --run-time 1m --headless --json > ataque.json
+
+Todos os clientes saem do mesmo IP: rode o servidor com LOGIN_MAX_FAILURES_PER_IP alto para
+medir só o limite por conta, ou com o padrão para ver o bloqueio por IP.
+"""
+import os
+import random
+
+from locust import HttpUser, constant, task
+
+BENCH_USERS = int(os.environ.get('BENCH_USERS', 1000))
+BENCH_PREFIX = os.environ.get('BENCH_PREFIX', 'bench')
+BENCH_PASSWORD = os.environ.get('BENCH_PASSWORD', 'benchmark')
+
+
+class Attacker(HttpUser):
+    """Tenta senhas vazadas em contas existentes, sem pausa."""
+
+    weight = 9
+    wait_time = constant(0)
+
+    @task
+    def guess(self):
+        username = f'{BENCH_PREFIX}{random.randrange(BENCH_USERS)}'
+        with self.client.post(
+            '/api/token/', json={'username': username, 'password': f'senha{random.randrange(10 ** 6)}'},
+            name='/api/token/ (ataque)', catch_response=True,
+        ) as response:
+            # 401 e 429 são as respostas esperadas para o atacante
+            if response.status_code in (401, 429):
+                response.success()
+
+
+class LegitimateUser(HttpUser):
+    """Loga com a senha certa de vez em quando, como o app faz ao abrir."""
+
+    weight = 1
+    wait_time = constant(1)
+
+    @task
+    def login(self):
+        username = f'{BENCH_PREFIX}{random.randrange(BENCH_USERS)}'
+        self.client.post('/api/token/', json={'username': username, 'password': BENCH_PASSWORD}, name='/api/token/')
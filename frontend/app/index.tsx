@@ -33,11 +33,14 @@ const Index = () => {
 
   const fetchData = async (token: string) => {
     try {
+      // Reenvia o ETag da última resposta: se o feed não mudou, o servidor devolve 304 sem corpo
+      const etag = await AsyncStorage.getItem('feed_etag');
       const response = await fetch('http://127.0.0.1:8000/api/posts/', {
         method: 'GET',
         headers: {
           Authorization: `Token ${token}`,
           'Content-Type': 'application/json',
+          ...(etag ? { 'If-None-Match': etag } : {}),
         },
       });
 
@@ -45,12 +48,25 @@ const Index = () => {
         setError('Unauthorized access. Please log in again.');
         router.replace('/login');
         return;
+      } else if (response.status === 304) {
+        const cached = await AsyncStorage.getItem('feed_cache');
+        if (cached) {
+          setData(JSON.parse(cached));
+          return;
+        }
+        // Sem cópia local: busca de novo sem o ETag
+        await AsyncStorage.removeItem('feed_etag');
+        return fetchData(token);
       } else if (!response.ok) {
         throw new Error('Failed to load posts');
       }
 
       const data = await response.json();
-      setData(data);
+      setData(data.results);
+      const newEtag = response.headers.get('ETag');
+      if (newEtag) {
+        await AsyncStorage.multiSet([['feed_etag', newEtag], ['feed_cache', JSON.stringify(data.results)]]);
+      }
     } catch (error: any) {
       setError(error.message || 'Error fetching posts');
     } finally {